@@ -8,15 +8,17 @@ from app.db.session import SessionLocal
 
 from app.api import deps
 from app.api.deps import get_db
-from app.models.case import Case, CaseParty, CaseHistory, CaseAct, CaseOrder
+from app.models.case import Case, CaseOrder
 from app.models.workspace import Workspace
 from app.models.user import User
 from app.schemas.case import Case as CaseSchema, CaseCreate, CaseUpdate, HearingResponse, CaseIndexRow, CaseSummaryDTO
-from app.services.scraper.flows import refresh_case
+from app.services.scraper.flows import refresh_case, source_fingerprint
+from app.services.scraper.pdfs import fetch_order_pdf
+from app.services.reconcile import reconcile_case_children, summarize as summarize_changes
 from app.models.workspace_refresh_job import WorkspaceRefreshJob
 from datetime import datetime, timedelta
-from app.services.storage import get_storage
-from sqlalchemy import or_
+from app.services.storage import get_storage, blobs
+from sqlalchemy import or_, update
 from datetime import datetime, timedelta, date
 from rich import print
 
@@ -30,6 +32,32 @@ import os
 MAX_REFRESH_WORKERS = int(os.getenv("MAX_REFRESH_WORKERS", 8))
 
 
+def count_refresh_job_case(db: Session, job_id: UUID, failed: bool = False):
+    """
+    Counts one finished case on a refresh job (atomic UPDATE ... RETURNING,
+    workers run concurrently) and completes the job with its last case.
+    Part of the caller's transaction.
+    """
+    column = WorkspaceRefreshJob.failed_cases if failed else WorkspaceRefreshJob.completed_cases
+    row = db.execute(
+        update(WorkspaceRefreshJob)
+        .where(WorkspaceRefreshJob.id == job_id)
+        .values({column: column + 1})
+        .returning(
+            WorkspaceRefreshJob.completed_cases,
+            WorkspaceRefreshJob.failed_cases,
+            WorkspaceRefreshJob.total_cases
+        )
+    ).first()
+
+    if row and row.completed_cases + row.failed_cases >= row.total_cases:
+        db.execute(
+            update(WorkspaceRefreshJob)
+            .where(WorkspaceRefreshJob.id == job_id)
+            .values(status="completed")
+        )
+
+
 async def perform_full_case_refresh(case_id: UUID, job_id: UUID | None = None):
     db = SessionLocal()
     print(f"[bold yellow]REQUEST[/bold yellow]: Running background refresh for {case_id}")
@@ -50,19 +78,31 @@ async def perform_full_case_refresh(case_id: UUID, job_id: UUID | None = None):
         case.sync_status = "in_progress"
         db.commit()
 
-        result = await refresh_case(case.cino, max_retries=5)
+        result = await refresh_case(
+            case.cino,
+            max_retries=5,
+            known_fingerprint=case.source_fingerprint
+        )
+
+        # ---- UNCHANGED UPSTREAM: only mark as synced ----
+        if result and result.get("unchanged"):
+            case.sync_last_synced_at = datetime.utcnow()
+            case.sync_status = "fresh"
+            case.sync_error_message = None
+
+            if job:
+                count_refresh_job_case(db, job.id)
+
+            db.commit()
+            print(f"[bold green]SUCCESS: Case {case_id} unchanged: {case.cino}[/bold green]")
+            return
 
         if not result or not result.get("data"):
             case.sync_status = "error"
             case.sync_error_message = "Failed to refresh"
             
             if job:
-                db.query(WorkspaceRefreshJob).filter(
-                    WorkspaceRefreshJob.id == job.id
-                ).update({
-                    WorkspaceRefreshJob.failed_cases:
-                        WorkspaceRefreshJob.failed_cases + 1
-                })
+                count_refresh_job_case(db, job.id, failed=True)
 
             db.commit()
             return
@@ -103,90 +143,20 @@ async def perform_full_case_refresh(case_id: UUID, job_id: UUID | None = None):
         case.sync_last_synced_at = data["meta_scraped_at"]
         case.sync_status = "fresh"
         case.sync_error_message = None
+        case.source_fingerprint = source_fingerprint(result)
 
-        # ---- WIPE CHILDREN ----
-        db.query(CaseParty).filter(CaseParty.case_id == case.id).delete()
-        db.query(CaseAct).filter(CaseAct.case_id == case.id).delete()
-        db.query(CaseHistory).filter(CaseHistory.case_id == case.id).delete()
-        # db.query(CaseOrder).filter(CaseOrder.case_id == case.id).delete()
-        
-        # ---- CLEAN OLD ORDERS + FILES ----
-        old_orders = db.query(CaseOrder).filter(
-            CaseOrder.case_id == case.id
-        ).all()
-
-        storage = get_storage()
-
-        for order in old_orders:
-            if order.file_path:
-                try:
-                    await storage.delete(order.file_path)
-                except Exception as e:
-                    print(f"[bold blue]PDF[/bold blue]: [bold red]ERROR[/bold red]: Failed to delete old PDF:", order.file_path, e)
-
-        # Now delete DB rows
-        db.query(CaseOrder).filter(
-            CaseOrder.case_id == case.id
-        ).delete()
-
-        for p in data["parties"]:
-            db.add(CaseParty(
-                case_id=case.id,
-                is_petitioner=p["is_petitioner"],
-                name=p["name"],
-                advocate=p["advocate"],
-                role=p["role"],
-                raw_text=p["raw_text"]
-            ))
-
-        for a in data["acts"]:
-            db.add(CaseAct(
-                case_id=case.id,
-                act_name=a["act_name"],
-                section=a["section"],
-                act_code=a["act_code"]
-            ))
-
-        for h in data["history"]:
-            db.add(CaseHistory(
-                case_id=case.id,
-                business_date=h["business_date"],
-                hearing_date=h["hearing_date"],
-                purpose=h["purpose"],
-                stage=h["stage"],
-                notes=h["notes"],
-                judge=h["judge"],
-                source=h["source"]
-            ))
-
-        for o in data.get("orders", []):
-            db.add(CaseOrder(
-                case_id=case.id,
-                order_no=o.get("order_no"),
-                order_date=o.get("order_date"),
-                order_details=o.get("order_details"),
-                pdf_filename=o.get("pdf_filename"),
-                file_path=o.get("file_path"),
-                file_size=o.get("file_size"),
-            ))
+        # ---- RECONCILE CHILDREN ----
+        # Rows are matched on natural keys; only what changed is written
+        changes, unused_files = reconcile_case_children(db, case, data)
+        print(f"[bold cyan]CNR[/bold cyan]: {case.cino}: {summarize_changes(changes)}")
+        await blobs.confirm_order_files(db, case.id)
 
         if job:
-            db.query(WorkspaceRefreshJob).filter(
-                WorkspaceRefreshJob.id == job.id
-            ).update({
-                WorkspaceRefreshJob.completed_cases:
-                    WorkspaceRefreshJob.completed_cases + 1
-            })
-
-            updated_job = db.query(WorkspaceRefreshJob).filter(
-                WorkspaceRefreshJob.id == job.id
-            ).first()
-
-            if updated_job.completed_cases + updated_job.failed_cases >= updated_job.total_cases:
-                updated_job.status = "completed"
+            count_refresh_job_case(db, job.id)
 
         # SINGLE COMMIT
         db.commit()
+        await blobs.delete_files(db, unused_files)
         print(f"[bold green]SUCCESS: Refreshed case {case_id}: {case.cino}[/bold green]")
 
     except Exception:
@@ -198,24 +168,7 @@ async def perform_full_case_refresh(case_id: UUID, job_id: UUID | None = None):
             case.sync_error_message = "Background refresh failed"
 
         if job_id:
-            job = db.query(WorkspaceRefreshJob).filter(
-                WorkspaceRefreshJob.id == job_id
-            ).first()
-            if job:
-                db.query(WorkspaceRefreshJob).filter(
-                    WorkspaceRefreshJob.id == job.id
-                ).update({
-                    WorkspaceRefreshJob.failed_cases:
-                        WorkspaceRefreshJob.failed_cases + 1
-                })
-
-                # 🔥 ADD COMPLETION CHECK
-                updated_job = db.query(WorkspaceRefreshJob).filter(
-                    WorkspaceRefreshJob.id == job.id
-                ).first()
-
-                if updated_job.completed_cases + updated_job.failed_cases >= updated_job.total_cases:
-                    updated_job.status = "completed"
+            count_refresh_job_case(db, job_id, failed=True)
 
         db.commit()
 
@@ -540,18 +493,14 @@ async def delete_case(
             CaseOrder.case_id == case.id
         ).all()
 
-        storage = get_storage()
-
-        for order in orders:
-            if order.file_path:
-                try:
-                    await storage.delete(order.file_path)
-                except Exception as e:
-                    print(f"[bold blue]PDF[/bold blue]: [bold red]ERROR[/bold red]: Failed to delete PDF:", order.file_path, e)
+        # PDFs shared with other cases stay until their last reference goes
+        unused_files = blobs.release_orders(db, orders)
 
         db.delete(case)
         db.commit()
 
+        await blobs.delete_files(db, unused_files)
+
     except Exception:
         db.rollback()
         raise HTTPException(status_code=500, detail="Failed to delete case")
@@ -576,9 +525,48 @@ async def get_case_order_pdf(
         CaseOrder.case_id == case.id
     ).first()
 
-    if not order or not order.file_path:
+    if not order or not order.pdf_available:
         raise HTTPException(status_code=404, detail="PDF not found")
 
+    # First view: reuse a copy stored for the same order elsewhere,
+    # otherwise fetch from eCourts and keep it in storage
+    if not order.file_path:
+        order.order_key = order.order_key or blobs.order_key(
+            order.order_no, order.order_date, order.pdf_link_args
+        )
+        existing = blobs.find_stored_order(db, order.order_key)
+        if existing:
+            info = {
+                "file_path": existing.file_path,
+                "file_size": existing.file_size,
+                "sha256": existing.blob_sha256,
+            }
+        else:
+            info = await fetch_order_pdf(order.pdf_link_args)
+        if not info:
+            raise HTTPException(status_code=502, detail="Failed to fetch PDF from eCourts")
+
+        # Viewers send parallel / range requests: only the request that
+        # actually fills the row takes the blob reference
+        claimed = db.query(CaseOrder).filter(
+            CaseOrder.id == order.id,
+            CaseOrder.file_path.is_(None)
+        ).update({
+            CaseOrder.file_path: info["file_path"],
+            CaseOrder.file_size: info["file_size"],
+            CaseOrder.blob_sha256: info["sha256"],
+            CaseOrder.order_key: order.order_key,
+            CaseOrder.pdf_filename: order.pdf_filename or f"order_{order.id}.pdf",
+        }, synchronize_session=False)
+
+        if claimed and blobs.acquire(db, info["sha256"], info["file_path"], info["file_size"]) == 1:
+            # Nothing else held the blob: make sure its file wasn't deleted meanwhile
+            if not await get_storage().exists(info["file_path"]):
+                db.rollback()
+                raise HTTPException(status_code=409, detail="Stored PDF was removed, please retry")
+        db.commit()
+        db.refresh(order)
+
     storage = get_storage()
     pdf_bytes = await storage.read(order.file_path)
 
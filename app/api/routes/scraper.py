@@ -3,20 +3,23 @@ from rich import print
 from fastapi import APIRouter, HTTPException, Response, Depends, Query
 from app.schemas.scraper import StartCaseRequest, CaptchaSubmitRequest, SessionStatusResponse, CaseResultResponse, SelectCaseRequest, MultiSelectRequest, MultiSaveRequest
 from app.schemas.sidebar import SidebarInitRequest, SidebarInitResponse, SidebarSubmitRequest
-from app.services.scraper.flows import start_session, get_captcha, submit_captcha, fetch_results, get_case_list, select_case
-from fastapi.concurrency import run_in_threadpool
-from app.services.scraper.session import ScraperSession
+from app.services.scraper.flows import start_session, get_captcha, submit_captcha, fetch_results, stream_results, get_case_list, select_case, select_cases, get_session_order_pdf, source_fingerprint
+from fastapi.responses import StreamingResponse
+from app.services.scraper.session import ScraperSession, get_io_stats as session_io_stats
+from app.core.redis import get_pool_stats
+from app.core.config import settings
 from app.services.scraper.errors import ECourtsError
 from app.api import deps
 from app.models.user import User
 from app.models.case import Case, CaseParty, CaseHistory, CaseAct, CaseOrder
 from app.api.deps import get_db
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.services.scraper.client import ECourtsClient
-from app.services.scraper.utils import parse_options_html
-from app.services.storage import get_storage
-from bs4 import BeautifulSoup
+from typing import Optional, Dict, Any
+from app.services.scraper import warm_pool, directory, ocr, case_list
+from app.services.storage import get_storage, blobs
+import json
 import time
 import base64
 import asyncio
@@ -28,31 +31,100 @@ from app.models.workspace_multi_save_job import WorkspaceMultiSaveJob
 
 MAX_MULTI_SAVE_WORKERS = int(os.getenv("MAX_MULTI_SAVE_WORKERS", 8))
 
+async def plan_multi_save(
+    db: Session,
+    session_id: str,
+    cnrs: list[str],
+    workspace_id: UUID,
+) -> Dict[str, Any]:
+    """
+    Decides, before anything is scraped, how each CNR of a /save-multiple
+    request gets its data:
+      existing  already in the workspace (one query), skipped
+      results   CNR -> fetch_results output the scraper session already holds
+      pages     CNR -> case page HTML the session fetched on select
+      scrape    the rest, refreshed from scratch
+    plus the session's stored order PDFs ("files"), used with `results`.
+    """
+    existing = {
+        cino for (cino,) in db.query(Case.cino).filter(
+            Case.workspace_id == workspace_id,
+            Case.cino.in_(cnrs)
+        ).all()
+    }
+    todo = [cnr for cnr in cnrs if cnr not in existing]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pages: Dict[str, str] = {}
+    files: Dict[str, str] = {}
+    try:
+        session, cached = await ScraperSession.get_with_result(session_id)
+        await session.load_payload("selected_html", "result_html")
+        payload = session.data["payload"]
+
+        current = payload.get("cnr")
+        if current in todo:
+            if cached and cached.get("state") == "HISTORY_FETCHED" and cached.get("data"):
+                results[current] = cached
+                files = session.data.get("files", {})
+            elif payload.get("result_html"):
+                pages[current] = payload["result_html"]
+
+        for cnr, html in (payload.get("selected_html") or {}).items():
+            if cnr in todo and cnr not in results:
+                pages.setdefault(cnr, html)
+    except Exception as e:
+        # Expired search session: nothing to reuse
+        print(f"[bold yellow]WARN[/bold yellow]: Multi-save cannot reuse session {session_id}:", e)
+
+    return {
+        "existing": [cnr for cnr in cnrs if cnr in existing],
+        "results": results,
+        "pages": pages,
+        "files": files,
+        "scrape": [cnr for cnr in todo if cnr not in results and cnr not in pages],
+    }
+
+def count_multi_save_case(db: Session, job_id: UUID, failed: bool = False):
+    """
+    Counts one finished case on the job in a single atomic UPDATE (workers
+    run concurrently in separate DB sessions) and completes the job with
+    its last case.
+    """
+    column = WorkspaceMultiSaveJob.failed_cases if failed else WorkspaceMultiSaveJob.completed_cases
+    row = db.execute(
+        update(WorkspaceMultiSaveJob)
+        .where(WorkspaceMultiSaveJob.id == job_id)
+        .values({column: column + 1})
+        .returning(
+            WorkspaceMultiSaveJob.completed_cases,
+            WorkspaceMultiSaveJob.failed_cases,
+            WorkspaceMultiSaveJob.total_cases
+        )
+    ).first()
+
+    if row and row.completed_cases + row.failed_cases >= row.total_cases:
+        db.execute(
+            update(WorkspaceMultiSaveJob)
+            .where(WorkspaceMultiSaveJob.id == job_id)
+            .values(status="completed")
+        )
+    db.commit()
+
 async def perform_multi_save_case(
     cnr: str,
     workspace_id: UUID,
     job_id: UUID | None = None,
+    result: Optional[Dict[str, Any]] = None,
+    result_html: Optional[str] = None,
+    files: Optional[Dict[str, str]] = None,
 ):
     db = SessionLocal()
-
-    job = None
-    if job_id:
-        job = db.query(WorkspaceMultiSaveJob).filter(
-            WorkspaceMultiSaveJob.id == job_id
-        ).first()
+    files = files or {}
+    failed = False
 
     try:
-        # 🔁 Scrape fresh using CNR
-        from app.services.scraper.flows import refresh_case
-
-        result = await refresh_case(cnr, max_retries=5)
-
-        if not result or not result.get("data"):
-            return
-
-        data = result["data"]["structured_data"]
-
-        # 🚫 Skip if already exists
+        # 🚫 Skip if already exists (saved since the job was planned)
         existing = db.query(Case).filter(
             Case.cino == cnr,
             Case.workspace_id == workspace_id
@@ -61,6 +133,25 @@ async def perform_multi_save_case(
         if existing:
             return
 
+        from app.services.scraper.flows import refresh_case, fetch_results_from_html
+
+        # ♻️ Reuse what the scraper session already fetched
+        if result is None and result_html:
+            try:
+                result = await fetch_results_from_html(cnr, result_html)
+            except Exception as e:
+                print(f"[bold yellow]WARN[/bold yellow]: Reusing fetched page for {cnr} failed, scraping fresh:", e)
+                result = None
+
+        # 🔁 Scrape fresh using CNR
+        if not result or not result.get("data"):
+            result = await refresh_case(cnr, max_retries=5)
+
+        if not result or not result.get("data"):
+            raise Exception(f"No data scraped for {cnr}")
+
+        data = result["data"]["structured_data"]
+
         # 🧱 Create Case
         case_obj = Case(
             workspace_id=workspace_id,
@@ -90,7 +181,8 @@ async def perform_multi_save_case(
             meta_scraped_at=data["meta_scraped_at"],
             meta_source=data["meta_source"],
             meta_source_url=data["meta_source_url"],
-            raw_html=data["raw_html"]
+            raw_html=data["raw_html"],
+            source_fingerprint=source_fingerprint(result)
         )
 
         db.add(case_obj)
@@ -133,37 +225,44 @@ async def perform_multi_save_case(
                 order_date=o.get("order_date"),
                 order_details=o.get("order_details"),
                 pdf_filename=o.get("pdf_filename"),
-                file_path=o.get("file_path"),
-                file_size=o.get("file_size")
+                pdf_link_args=o.get("pdf_link_args"),
+                **blobs.resolve_order_file(db, o, fallback_path=files.get(o.get("pdf_filename"))),
             ))
 
-        db.commit()
+        # Stored PDFs held no blob reference until now: drop any that are gone
+        db.flush()
+        await blobs.confirm_order_files(db, case_obj.id)
 
-        if job:
-            job.completed_cases += 1
-            db.commit()
+        db.commit()
 
     except Exception:
         db.rollback()
-        if job:
-            job.failed_cases += 1
-            db.commit()
+        failed = True
     finally:
-        if job and (job.completed_cases + job.failed_cases >= job.total_cases):
-            job.status = "completed"
-            db.commit()
+        if job_id:
+            count_multi_save_case(db, job_id, failed=failed)
         db.close()
 
 async def run_multi_save_pool(
     cnrs: list[str],
     workspace_id: UUID,
-    job_id: UUID
+    job_id: UUID,
+    results: Optional[Dict[str, Dict[str, Any]]] = None,
+    pages: Optional[Dict[str, str]] = None,
+    files: Optional[Dict[str, str]] = None,
 ):
     semaphore = asyncio.Semaphore(MAX_MULTI_SAVE_WORKERS)
+    results = results or {}
+    pages = pages or {}
 
     async def worker(cnr: str):
         async with semaphore:
-            await perform_multi_save_case(cnr, workspace_id, job_id)
+            await perform_multi_save_case(
+                cnr, workspace_id, job_id,
+                result=results.get(cnr),
+                result_html=pages.get(cnr),
+                files=files if cnr in results else None
+            )
 
     await asyncio.gather(*(worker(cnr) for cnr in cnrs))
 
@@ -286,21 +385,39 @@ async def start_case(
 @router.get("/list/{session_id}")
 async def get_cases_list_route(
     session_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(settings.CASE_LIST_PAGE_SIZE, ge=1, le=settings.CASE_LIST_MAX_PAGE_SIZE),
+    case_type: Optional[str] = Query(None),
+    year: Optional[int] = Query(None),
+    court: Optional[str] = Query(None, description="Court name substring"),
+    party: Optional[str] = Query(None, description="Petitioner or respondent substring"),
+    petitioner: Optional[str] = Query(None),
+    respondent: Optional[str] = Query(None),
+    sort: case_list.SortKey = Query("index"),
+    descending: bool = Query(False),
     current_user: User = Depends(deps.get_current_active_user)
 ):
     try:
         limits = get_user_plan_limits(current_user)
 
-        result = await get_case_list(session_id)
-        cases = result.get("cases")
-
-        if not cases:
-            return []
-
-        # HARD WINDOW LIMIT
-        result["cases"] = cases[: limits.result_window]
-        return result
+        # HARD WINDOW LIMIT: only the first result_window rows are searchable
+        return await get_case_list(
+            session_id,
+            window=limits.result_window,
+            limit=limit,
+            cursor=cursor,
+            case_type=case_type,
+            year=year,
+            court=court,
+            party=party,
+            petitioner=petitioner,
+            respondent=respondent,
+            sort=sort,
+            descending=descending,
+        )
 
+    except case_list.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[bold red]ERROR[/bold red]: Error in get_cases_list_route:",e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -325,31 +442,22 @@ async def select_multiple_cases(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """
-    Sequentially selects multiple cases using the same logic as single select.
-    No state mutation hacks.
+    Selects multiple cases using the same logic as single select, fetching
+    several at once (see flows.select_cases). Results keep request order.
     """
 
     results = []
 
     try:
-        for index in request.case_indices:
-            # Select + fully process one case
-            result = await select_case(session_id, index)
-            # result = await fetch_results(session_id)
-
+        async for result in select_cases(session_id, request.case_indices):
             if result.get("status") != "success":
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Case at index {index} not fully fetched"
+                    detail=f"Case at index {result.get('case_index')} not fully fetched"
                 )
 
             results.append(result)
 
-            # IMPORTANT:
-            # DO NOT manually override session.state
-            # select_case should return session naturally
-            # to CASE_LIST_LOADED at the end.
-
         return {"cases": results}
 
     except Exception as e:
@@ -357,6 +465,37 @@ async def select_multiple_cases(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/select-multiple/{session_id}/stream")
+async def select_multiple_cases_stream(
+    session_id: str,
+    request: MultiSelectRequest,
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Server-Sent Events variant of /select-multiple: one "case" event per
+    selected case, in request order, as soon as it is available (failed
+    cases carry status "error"), then "done" with the counts.
+    """
+    async def events():
+        selected = failed = 0
+        try:
+            async for result in select_cases(session_id, request.case_indices):
+                if result.get("status") == "success":
+                    selected += 1
+                else:
+                    failed += 1
+                yield f"event: case\ndata: {json.dumps(result, default=str)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'selected': selected, 'failed': failed})}\n\n"
+        except Exception as e:
+            print(f"[bold red]ERROR[/bold red]: Error in select_multiple_cases_stream:", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/captcha/{session_id}")
 async def get_captcha_image(
     session_id: str,
@@ -403,15 +542,12 @@ async def get_case_pdf(
     current_user: User = Depends(deps.get_current_active_user)
 ):
     """
-    Returns stored PDF for a scraped case.
+    Returns stored PDF for a scraped case, fetching it from eCourts on first view.
     Frontend-safe.
     """
 
     try:
-        session = await ScraperSession.get(session_id)
-
-        files = session.data.get("files", {})
-        stored_path = files.get(filename)
+        stored_path = await get_session_order_pdf(session_id, filename)
 
         if not stored_path:
             raise HTTPException(status_code=404, detail="PDF not found")
@@ -437,10 +573,11 @@ async def get_case_pdf(
 @router.get("/result/{session_id}", response_model=CaseResultResponse)
 async def get_result(
     session_id: str,
+    refresh: bool = Query(False, description="Re-scrape instead of serving the cached result"),
     current_user: User = Depends(deps.get_current_active_user)
 ):
     try:
-        result = await fetch_results(session_id)
+        result = await fetch_results(session_id, force_refresh=refresh)
         return CaseResultResponse(
             session_id=session_id,
             state=result.get("state"),
@@ -450,46 +587,71 @@ async def get_result(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/result/{session_id}/stream")
+async def stream_result(
+    session_id: str,
+    refresh: bool = Query(False, description="Re-scrape instead of serving the cached result"),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Server-Sent Events variant of /result: case metadata first, then each
+    history row's business text and each prefetched order PDF as they land,
+    and finally the same payload /result returns (event "result").
+    """
+    async def events():
+        try:
+            async for event, data in stream_results(session_id, force_refresh=refresh):
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            print(f"[bold red]ERROR[/bold red]: Error in stream_result:", e)
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/pool/stats")
+async def get_warm_pool_stats(
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Warm session pool size and refill metrics."""
+    return await warm_pool.get_metrics()
+
+@router.get("/redis/stats")
+async def get_redis_stats(
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Shared Redis pool utilisation and scraper session I/O counters."""
+    return {"pool": get_pool_stats(), "sessions": session_io_stats()}
+
+@router.get("/ocr/stats")
+async def get_ocr_stats(
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """Captcha OCR worker pool counters and latency percentiles."""
+    return ocr.get_metrics()
+
 @router.get("/meta/states")
 async def get_states(
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Fetch list of available states from eCourts."""
+    """List of available states (served from the court directory cache)."""
     try:
-        client = ECourtsClient()
-        # In threadpool to avoid blocking
-        token, home_html = await run_in_threadpool(client.get_initial_token)
-        
-        if not home_html:
-             raise HTTPException(status_code=503, detail="ECOURTS_UNAVAILABLE")
-
-        # if not token:
-        #     raise HTTPException(status_code=503, detail="ECOURTS_UNAVAILABLE")
-        
-        soup = BeautifulSoup(home_html, 'html.parser')
-        state_select = soup.find('select', id='sess_state_code')
-        
-        if not state_select:
-             raise HTTPException(status_code=503, detail="ECOURTS_UNAVAILABLE")
-             
-        states = parse_options_html(str(state_select))
+        states = await directory.get_states()
         return {"states": states}
-    except Exception as e:
-        # raise HTTPException(status_code=500, detail=str(e))
-        raise
+    except ECourtsError:
+        raise HTTPException(status_code=503, detail="ECOURTS_UNAVAILABLE")
 
 @router.get("/meta/districts/{state_code}")
 async def get_districts(
     state_code: str,
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Fetch districts for a given state."""
+    """Districts for a given state (served from the court directory cache)."""
     try:
-        client = ECourtsClient()
-        await run_in_threadpool(client.get_initial_token) # Init session
-        
-        resp = await run_in_threadpool(client.get_districts, state_code)
-        districts = parse_options_html(resp.text)
+        districts = await directory.get_districts(state_code)
         return {"districts": districts}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -500,13 +662,9 @@ async def get_complexes(
     dist_code: str,
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    """Fetch court complexes for a given state and district."""
+    """Court complexes for a given state and district (served from the court directory cache)."""
     try:
-        client = ECourtsClient()
-        await run_in_threadpool(client.get_initial_token) # Init session
-        
-        resp = await run_in_threadpool(client.get_complexes, state_code, dist_code)
-        complexes = parse_options_html(resp.text)
+        complexes = await directory.get_complexes(state_code, dist_code)
         return {"complexes": complexes}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -528,6 +686,10 @@ async def save_case_to_workspace(
              raise HTTPException(status_code=400, detail="Scraper session not completed or no data found")
              
         data = result["data"]["structured_data"]
+
+        # PDFs opened during preview are already in storage
+        session = await ScraperSession.get(session_id)
+        session_files = session.data.get("files", {})
         
         # 2. Check if exists
         cino = data["cino"]
@@ -578,7 +740,8 @@ async def save_case_to_workspace(
             meta_scraped_at=data["meta_scraped_at"],
             meta_source=data["meta_source"],
             meta_source_url=data["meta_source_url"],
-            raw_html=data["raw_html"]
+            raw_html=data["raw_html"],
+            source_fingerprint=source_fingerprint(result)
         )
         
         db.add(case_obj)
@@ -627,9 +790,13 @@ async def save_case_to_workspace(
                 order_date=o.get("order_date"),
                 order_details=o.get("order_details"),
                 pdf_filename=o.get("pdf_filename"),
-                file_path=o.get("file_path"),
-                file_size=o.get("file_size")
+                pdf_link_args=o.get("pdf_link_args"),
+                **blobs.resolve_order_file(db, o, fallback_path=session_files.get(o.get("pdf_filename"))),
             ))
+
+        # Preview PDFs held no blob reference until now: drop any that are gone
+        db.flush()
+        await blobs.confirm_order_files(db, case_obj.id)
             
         db.commit()
         db.refresh(case_obj)
@@ -658,33 +825,52 @@ async def save_multiple_cases(
             detail=f"Save limit exceeded ({limits.multi_save})"
         )
 
-    # 1️⃣ Create job
+    cnrs = list(dict.fromkeys(request.case_cnrs))
+
+    # 1️⃣ Plan: skip existing cases, reuse fetched data, scrape the rest
+    plan = await plan_multi_save(db, session_id, cnrs, workspace_id)
+    pending = [cnr for cnr in cnrs if cnr not in plan["existing"]]
+
+    print(
+        f"[bold blue]MULTI SAVE[/bold blue]: [bold blue]DEBUG[/bold blue]: {len(cnrs)} cases: "
+        f"{len(plan['existing'])} existing, {len(plan['results'])} cached results, "
+        f"{len(plan['pages'])} fetched pages, {len(plan['scrape'])} to scrape"
+    )
+
+    # 2️⃣ Create job (existing cases count as done)
     job = WorkspaceMultiSaveJob(
         workspace_id=workspace_id,
-        total_cases=len(request.case_cnrs),
-        completed_cases=0,
+        total_cases=len(cnrs),
+        completed_cases=len(plan["existing"]),
         failed_cases=0,
-        status="running"
+        status="running" if pending else "completed"
     )
 
     db.add(job)
     db.commit()
     db.refresh(job)
 
-    # 2️⃣ Launch async pool
-    asyncio.create_task(
-        run_multi_save_pool(
-            request.case_cnrs,
-            workspace_id,
-            job.id
+    # 3️⃣ Launch async pool
+    if pending:
+        asyncio.create_task(
+            run_multi_save_pool(
+                pending,
+                workspace_id,
+                job.id,
+                results=plan["results"],
+                pages=plan["pages"],
+                files=plan["files"]
+            )
         )
-    )
 
     return {
         "job_id": job.id,
         "total": job.total_cases,
         "workers": MAX_MULTI_SAVE_WORKERS,
-        "status": job.status
+        "status": job.status,
+        "skipped_existing": len(plan["existing"]),
+        "reused": len(plan["results"]) + len(plan["pages"]),
+        "to_scrape": len(plan["scrape"])
     }
 
 @router.get("/multi-save-jobs/{job_id}")
@@ -762,14 +948,14 @@ async def sidebar_submit(
 
         # ✅ sync mode with sidebar form
         session.data["search_mode"] = request.search_mode
+        session.mark_dirty("search_mode")
 
         # ✅ replace payload cleanly
         # session.data["payload"] = request.payload
-        session.data["payload"] = build_ecourts_payload(
+        session.replace_payload(build_ecourts_payload(
             session.search_mode,
             request.payload
-        )
-        session.is_dirty = True
+        ))
 
         await session.save()
 
@@ -45,6 +45,68 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     SESSION_TTL: int = 900  # 15 minutes
+    SESSION_FLUSH_INTERVAL: float = 5.0  # max seconds a flow holds unsaved session changes
+    REDIS_MAX_CONNECTIONS: int = 50  # per process, shared by all callers
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds to wait for a free connection
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+
+    # eCourts HTTP transport (shared connection pool)
+    ECOURTS_MAX_CONNECTIONS: int = 100
+    ECOURTS_MAX_KEEPALIVE: int = 20
+    ECOURTS_KEEPALIVE_EXPIRY: float = 30.0
+    ECOURTS_CONNECT_RETRIES: int = 1
+    ECOURTS_HTTP_TIMEOUT: float = 30.0
+    ECOURTS_CONNECT_TIMEOUT: float = 10.0
+
+    # Warm pool of pre-tokenised eCourts sessions
+    WARM_POOL_SIZE: int = 5  # 0 disables the pool
+    WARM_POOL_REFILL_INTERVAL: int = 30  # seconds
+    WARM_POOL_REFILL_CONCURRENCY: int = 4
+    WARM_POOL_TTL_MARGIN: int = 120  # seconds kept in reserve below SESSION_TTL
+    WARM_POOL_PREFETCH_CAPTCHA: bool = False
+    WARM_POOL_RESERVE: int = 2  # entries parallel fetches leave for start_session
+
+    # Court directory (states / districts / complexes) cache
+    COURT_DIR_FRESH_TTL: int = 86400  # serve without revalidating for 1 day
+    COURT_DIR_MAX_AGE: int = 30 * 86400  # hard expiry in Redis
+    COURT_DIR_LRU_SIZE: int = 2048
+
+    # Business detail fetching (viewBusiness) in fetch_results
+    BUSINESS_FETCH_SESSIONS: int = 3  # eCourts sessions per case; 1 = sequential
+    BUSINESS_FETCH_SHARD_MIN_ROWS: int = 12  # fewer rows run on the scrape session alone
+    BUSINESS_FETCH_GLOBAL_LIMIT: int = 32  # in-flight viewBusiness calls per process
+    MULTI_SELECT_SESSIONS: int = 4  # eCourts sessions per /select-multiple; 1 = sequential
+    MULTI_SELECT_SHARD_MIN_CASES: int = 3  # fewer cases run on the scrape session alone
+
+    # Order PDFs are fetched on first view; optionally prefetch the N most recent
+    ORDER_PDF_PREFETCH_RECENT: int = 0
+    PDF_FETCH_CONCURRENCY: int = 4  # eCourts sessions per case prefetch, reused across its orders
+    PDF_FETCH_GLOBAL_LIMIT: int = 16  # parallel downloads per process
+    PDF_READY_TIMEOUT: float = 15.0  # seconds to wait for display_pdf to produce the report
+    PDF_POLL_INITIAL_DELAY: float = 0.1
+    PDF_POLL_MAX_DELAY: float = 1.0
+    PDF_STREAM_CHUNK_SIZE: int = 64 * 1024
+
+    # Party / Advocate result list paging (/scraper/list)
+    CASE_LIST_PAGE_SIZE: int = 20
+    CASE_LIST_MAX_PAGE_SIZE: int = 100
+    CASE_LIST_INDEX_CACHE_SIZE: int = 256  # search sessions with an in-memory index, per process
+
+    # BeautifulSoup tree builder for scraper parsing: "lxml" or "html.parser"
+    SCRAPER_HTML_PARSER: str = "lxml"
+
+    # Captcha OCR worker pool
+    OCR_WORKERS: int = 2
+    OCR_PSM: int = 7  # treat the captcha as a single text line
+    OCR_WHITELIST: str = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    OCR_PREPROCESS: bool = False  # off by default: NumPy clean-up before OCR; enable once app/scripts/benchmark_captcha.py shows a first-try gain
+    OCR_DILATE_ITERATIONS: int = 0
+
+    # Captcha solver: "tesseract", "template" (trained classifier) or
+    # "auto" (template first, tesseract when the model has no answer)
+    CAPTCHA_SOLVER: str = "tesseract"
+    CAPTCHA_MODEL_PATH: str = "./captcha_model.npz"
+    CAPTCHA_COLLECT_DIR: str = ""  # opt-in: store captchas eCourts accepted, for training
 
     model_config = SettingsConfigDict(
         env_file=".env", 
@@ -1,5 +1,61 @@
 import redis.asyncio as redis
+from typing import Optional, Dict, Any
 from app.core.config import settings
+from rich import print
+
+# One connection pool per process. Opened on app startup (or lazily on first
+# use, e.g. from scripts) and closed on shutdown; every get_redis() caller
+# shares it instead of building a new client + pool per call.
+_pool: Optional[redis.BlockingConnectionPool] = None
+_client: Optional[redis.Redis] = None
+
+
+def _open() -> redis.Redis:
+    global _pool, _client
+    if _client is None:
+        _pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,  # wait for a free connection, then raise
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _client = redis.Redis(connection_pool=_pool)
+    return _client
+
 
 async def get_redis() -> redis.Redis:
-    return redis.from_url(settings.REDIS_URL)
+    return _open()
+
+
+async def init_redis():
+    client = _open()
+    try:
+        await client.ping()
+        print(f"[bold cyan]STARTUP[/bold cyan]: Redis pool ready (max {settings.REDIS_MAX_CONNECTIONS} connections)")
+    except Exception as e:
+        print(f"[bold cyan]STARTUP[/bold cyan]: [bold red]ERROR[/bold red]: Redis unreachable:", e)
+
+
+async def close_redis():
+    global _pool, _client
+    if _client is None:
+        return
+    await _client.aclose()
+    await _pool.disconnect()
+    _pool = None
+    _client = None
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    if _pool is None:
+        return {"open": False, "max_connections": settings.REDIS_MAX_CONNECTIONS}
+
+    in_use = len(getattr(_pool, "_in_use_connections", ()))
+    idle = len(getattr(_pool, "_available_connections", ()))
+    return {
+        "open": True,
+        "max_connections": _pool.max_connections,
+        "in_use": in_use,
+        "idle": idle,
+        "utilisation": round(in_use / _pool.max_connections, 3),
+    }
@@ -10,6 +10,9 @@ from app.db.session import SessionLocal
 from app.models.workspace_refresh_job import WorkspaceRefreshJob
 from app.models.workspace_multi_save_job import WorkspaceMultiSaveJob
 from app.models.case import Case
+from app.services.scraper.transport import close_transport
+from app.core.redis import init_redis, close_redis
+from app.services.scraper import warm_pool, ocr
 from datetime import datetime
 from rich import print
 
@@ -134,4 +137,16 @@ def cleanup_refresh_jobs_on_shutdown():
         print(f"[bold red]SHUTDOWN[/bold red]: [bold red]ERROR[/bold red]: cleanup failed:", e)
 
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@app.on_event("startup")
+async def start_warm_pool():
+    await init_redis()
+    warm_pool.start()
+
+@app.on_event("shutdown")
+async def close_ecourts_transport():
+    await warm_pool.stop()
+    await close_transport()
+    ocr.shutdown()
+    await close_redis()
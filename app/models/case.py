@@ -57,6 +57,7 @@ class Case(Base):
     sync_last_synced_at = Column(DateTime, nullable=True)
     sync_status = Column(String, default="never") # fresh, stale, error, never
     sync_error_message = Column(Text, nullable=True)
+    source_fingerprint = Column(String(64), nullable=True) # hash of the normalised eCourts case page
 
     # --- Meta ---
     meta_scraped_at = Column(DateTime, nullable=True)
@@ -75,8 +76,9 @@ class Case(Base):
     # Rename to _parties so we can expose a structured "parties" property
     _parties = relationship("CaseParty", back_populates="case", cascade="all, delete-orphan")
     acts = relationship("CaseAct", back_populates="case", cascade="all, delete-orphan")
-    history = relationship("CaseHistory", back_populates="case", cascade="all, delete-orphan")
-    orders = relationship("CaseOrder", back_populates="case", cascade="all, delete-orphan")
+    # Refresh updates rows in place, so don't rely on insertion order
+    history = relationship("CaseHistory", back_populates="case", cascade="all, delete-orphan", order_by="CaseHistory.business_date")
+    orders = relationship("CaseOrder", back_populates="case", cascade="all, delete-orphan", order_by="CaseOrder.order_date")
     
     # Relation back from appointments
     appointments = relationship("Appointment", back_populates="case")
@@ -258,7 +260,27 @@ class CaseOrder(Base):
     pdf_filename = Column(String, nullable=True) # stored filename
     file_path = Column(String, nullable=True)  # full storage path
     file_size = Column(Integer, nullable=True) # file size in bytes
+    pdf_link_args = Column(ARRAY(String), nullable=True) # eCourts displayPdf args for on-demand fetch
+    order_key = Column(String(64), nullable=True, index=True) # hash of order_no + order_date + link args
+    blob_sha256 = Column(String(64), ForeignKey("order_blobs.sha256"), nullable=True, index=True)
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     case = relationship("Case", back_populates="orders")
+    blob = relationship("OrderBlob")
+
+    @property
+    def pdf_available(self) -> bool:
+        return bool(self.file_path) or bool(self.pdf_link_args)
+
+
+class OrderBlob(Base):
+    """Content-addressed order PDF, shared by every case_orders row with the same bytes."""
+    __tablename__ = "order_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
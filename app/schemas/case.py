@@ -141,6 +141,7 @@ class CaseOrderSchema(BaseModel):
     pdf_filename: Optional[str] = None
     file_path: Optional[str] = None
     file_size: Optional[int] = None
+    pdf_available: bool = False
 
     class Config:
         from_attributes = True
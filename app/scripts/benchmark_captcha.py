@@ -0,0 +1,118 @@
+import sys
+import time
+import hashlib
+import argparse
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.scraper import ocr, captcha_model
+
+# Labelled corpus layout: one image per captcha, named after its answer,
+# e.g. "a7Kx2.png" or "a7Kx2_003.png" when the same text occurs twice.
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+
+# Deterministic holdout: a file belongs to the eval split by a hash of its
+# name, so the trainer and the benchmark agree on it without a manifest
+HOLDOUT_PERCENT = 20
+SPLITS = ("train", "eval", "all")
+
+
+def in_holdout(path: Path) -> bool:
+    return int(hashlib.sha256(path.name.encode()).hexdigest(), 16) % 100 < HOLDOUT_PERCENT
+
+
+def load_corpus(corpus_dir: Path, split: str = "all"):
+    samples = []
+    for path in sorted(corpus_dir.iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        if split != "all" and in_holdout(path) != (split == "eval"):
+            continue
+        samples.append((path.stem.split("_")[0], path.read_bytes()))
+    return samples
+
+
+def check_unseen(model: captcha_model.TemplateClassifier, samples) -> str:
+    """Why `model` can't be scored on `samples` (empty when it can)."""
+    if model.trained_on is None:
+        return "the model does not record its training images; retrain it with app/scripts/train_captcha_model.py"
+    seen = set(model.trained_on.tolist())
+    overlap = sum(captcha_model.sample_id(image_bytes) in seen for _, image_bytes in samples)
+    if overlap:
+        return f"{overlap} of {len(samples)} images were used to train it; score it on the eval split or a separate corpus"
+    return ""
+
+
+def run_pass(samples, solver):
+    exact = folded = 0
+    timings = []
+
+    for label, image_bytes in samples:
+        started = time.perf_counter()
+        text = solver(image_bytes)
+        timings.append((time.perf_counter() - started) * 1000)
+
+        exact += text == label
+        folded += text.lower() == label.lower()
+
+    timings.sort()
+    n = len(samples)
+    return {
+        "accuracy": exact / n,
+        "accuracy_nocase": folded / n,
+        "mean_ms": sum(timings) / n,
+        "p50_ms": timings[n // 2],
+        "p95_ms": timings[min(int(n * 0.95), n - 1)],
+    }
+
+
+def main(corpus_dir: Path, modes, split: str = "eval", model=None):
+    samples = load_corpus(corpus_dir, split)
+    if not samples:
+        print(f"No captcha images found in {corpus_dir} ({split} split)")
+        sys.exit(1)
+
+    if model is not None and any(name == "template" for name, _ in modes):
+        reason = check_unseen(model, samples)
+        if reason:
+            print(f"Refusing to score the template model: {reason}")
+            sys.exit(1)
+
+    print(f"{len(samples)} captchas from {corpus_dir} ({split} split)\n")
+    print(f"{'pipeline':<12} {'first-try':>9} {'no-case':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, solver in modes:
+        r = run_pass(samples, solver)
+        print(
+            f"{name:<12} {r['accuracy']:>9.1%} {r['accuracy_nocase']:>8.1%} "
+            f"{r['mean_ms']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}"
+        )
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Captcha OCR accuracy / latency benchmark")
+    parser.add_argument("corpus_dir", type=Path, help="directory of captcha images named <answer>[_n].png")
+    parser.add_argument("--only", choices=["raw", "preprocessed", "template"], help="run a single pipeline")
+    parser.add_argument("--model", type=Path, help="template model to compare (defaults to CAPTCHA_MODEL_PATH)")
+    parser.add_argument("--split", choices=SPLITS, default="eval",
+                        help="which part of the corpus to score (default: the holdout the trainer leaves out; "
+                             "use 'all' for a separate eval corpus)")
+    args = parser.parse_args()
+
+    modes = [
+        ("raw", lambda img: ocr.solve_captcha(img, preprocess=False)),
+        ("preprocessed", lambda img: ocr.solve_captcha(img, preprocess=True)),
+    ]
+
+    model = None
+    model_path = args.model or Path(settings.CAPTCHA_MODEL_PATH)
+    if model_path.exists():
+        model = captcha_model.TemplateClassifier.load(str(model_path))
+        modes.append(("template", model.predict))
+
+    if args.only:
+        modes = [m for m in modes if m[0] == args.only]
+
+    main(args.corpus_dir, modes, args.split, model)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,156 @@
+import sys
+import json
+import time
+import difflib
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from app.services.scraper import utils
+from app.services.scraper.processor import (
+    parse_full_case_data, extract_case, sanitize_html, parse_case_list, parse_business_html
+)
+from app.services.scraper.transformer import transform_to_schema
+from app.services.scraper.utils import parse_options_html
+
+# Offline benchmark + regression check for the scraper's parsing stages.
+# Corpus: anonymised eCourts fragments under tests/fixtures/scraper/<kind>/,
+# expected output under tests/fixtures/scraper/golden/<stage>/<fixture>.json.
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "scraper"
+GOLDEN_DIR = FIXTURES_DIR / "golden"
+
+BENCHMARK_CINO = "XXXX000000000000"
+# Set from the clock, not the fixture
+VOLATILE_FIELDS = ("meta_scraped_at",)
+
+# stage -> (fixture folder, callable taking the fixture text)
+STAGES = {
+    "parse_full_case_data": ("case_history", parse_full_case_data),
+    "extract_case": ("case_history", extract_case),
+    "sanitize_html": ("case_history", sanitize_html),
+    "transform_to_schema": ("case_history", None),  # input is parsed outside the timed loop
+    "parse_case_list": ("case_list", parse_case_list),
+    "parse_business_html": ("business", parse_business_html),
+    "parse_options_html": ("options", parse_options_html),
+}
+
+
+def load_cases(stage: str):
+    folder, fn = STAGES[stage]
+    for path in sorted((FIXTURES_DIR / folder).iterdir()):
+        if not path.is_file():
+            continue
+        text = path.read_text(encoding="utf-8")
+
+        if stage == "transform_to_schema":
+            parsed = parse_full_case_data(text)
+            yield path.stem, (lambda parsed=parsed: transform_to_schema(parsed, BENCHMARK_CINO))
+        else:
+            yield path.stem, (lambda text=text, fn=fn: fn(text))
+
+
+def to_jsonable(output):
+    if hasattr(output, "model_dump"):
+        output = output.model_dump(mode="json", exclude=set(VOLATILE_FIELDS))
+    return json.loads(json.dumps(output, default=str))
+
+
+def check_golden(stage: str, name: str, output, update: bool):
+    """Returns None when output matches golden, else a short diff."""
+    path = GOLDEN_DIR / stage / f"{name}.json"
+    actual = to_jsonable(output)
+
+    if update:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(actual, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        return None
+
+    if not path.exists():
+        return f"missing golden file {path.relative_to(FIXTURES_DIR)} (run with --update-golden)"
+
+    expected = json.loads(path.read_text(encoding="utf-8"))
+    if actual == expected:
+        return None
+
+    diff = difflib.unified_diff(
+        json.dumps(expected, indent=2, ensure_ascii=False, sort_keys=True).splitlines(),
+        json.dumps(actual, indent=2, ensure_ascii=False, sort_keys=True).splitlines(),
+        "golden", "actual", lineterm="", n=1
+    )
+    return "\n".join(list(diff)[:20])
+
+
+def time_case(fn, iterations: int, max_seconds: float):
+    fn()  # warm up (imports, regex caches)
+
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < iterations and (len(timings) < 3 or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    n = len(timings)
+    return {
+        "runs": n,
+        "ops_per_sec": 1000 * n / sum(timings),
+        "p50_ms": timings[n // 2],
+        "p99_ms": timings[min(int(n * 0.99), n - 1)],
+    }
+
+
+def peak_memory_kib(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def main(stages, iterations: int, max_seconds: float, update_golden: bool) -> int:
+    print(f"HTML parser: {utils.HTML_PARSER}, fixtures: {FIXTURES_DIR}\n")
+    print(f"{'stage':<22} {'fixture':<30} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>9}  golden")
+
+    failures = []
+    for stage in stages:
+        for name, fn in load_cases(stage):
+            mismatch = check_golden(stage, name, fn(), update_golden)
+            r = time_case(fn, iterations, max_seconds)
+            peak = peak_memory_kib(fn)
+
+            status = "updated" if update_golden else ("ok" if mismatch is None else "DIFF")
+            print(
+                f"{stage:<22} {name:<30} {r['ops_per_sec']:>9.1f} {r['p50_ms']:>9.2f} "
+                f"{r['p99_ms']:>9.2f} {peak:>9.0f}  {status}"
+            )
+            if mismatch:
+                failures.append((stage, name, mismatch))
+
+    for stage, name, mismatch in failures:
+        print(f"\n❌ {stage} / {name} diverges from golden:\n{mismatch}")
+
+    return 1 if failures else 0
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Scraper parsing benchmark and golden-output check")
+    parser.add_argument("--stage", choices=list(STAGES), action="append", help="run only these stages (repeatable)")
+    parser.add_argument("--iterations", type=int, default=50, help="timed runs per fixture")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="time budget per fixture")
+    parser.add_argument("--parser", choices=utils.SUPPORTED_PARSERS, help="override SCRAPER_HTML_PARSER")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite golden JSON from current output")
+    args = parser.parse_args()
+
+    if args.parser:
+        utils.HTML_PARSER = utils._resolve_parser(args.parser)
+
+    code = main(args.stage or list(STAGES), args.iterations, args.max_seconds, args.update_golden)
+    if code == 0:
+        print("\n✅ Golden files updated" if args.update_golden else "\n✅ All outputs match golden")
+    sys.exit(code)
+
+if __name__ == "__main__":
+    run()
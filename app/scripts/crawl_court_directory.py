@@ -0,0 +1,28 @@
+import sys
+import asyncio
+
+from app.services.scraper import directory
+from app.services.scraper.transport import close_transport
+from app.core.redis import close_redis
+
+
+async def main(concurrency: int):
+    try:
+        totals = await directory.crawl(concurrency=concurrency)
+    finally:
+        await close_transport()
+        await close_redis()
+
+    print(
+        f"States: {totals['states']}, districts: {totals['districts']}, "
+        f"complexes: {totals['complexes']}, failed states: {totals['failed']}"
+    )
+
+
+def run():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    asyncio.run(main(concurrency))
+    print("✅ Court directory crawl complete")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,39 @@
+import argparse
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.scraper import captcha_model
+from app.scripts.benchmark_captcha import load_corpus, HOLDOUT_PERCENT
+
+
+def main(corpus_dir: Path, out_path: Path, split: str = "train"):
+    samples = load_corpus(corpus_dir, split)
+    model, stats = captcha_model.train(samples)
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    model.save(str(out_path))
+
+    print(
+        f"Samples used: {stats['used']}, skipped (segmentation mismatch): {stats['skipped']}, "
+        f"chars: {stats['chars']}, templates: {stats['templates']}"
+    )
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Train the template captcha classifier")
+    parser.add_argument("corpus_dir", type=Path, nargs="?", default=settings.CAPTCHA_COLLECT_DIR,
+                        help="labelled captchas (defaults to CAPTCHA_COLLECT_DIR)")
+    parser.add_argument("--out", type=Path, default=Path(settings.CAPTCHA_MODEL_PATH))
+    parser.add_argument("--all", action="store_true",
+                        help=f"also train on the {HOLDOUT_PERCENT}%% holdout the benchmark scores "
+                             "(the model can then only be benchmarked on a separate corpus)")
+    args = parser.parse_args()
+
+    if not args.corpus_dir:
+        parser.error("corpus_dir is required when CAPTCHA_COLLECT_DIR is not set")
+
+    main(Path(args.corpus_dir), args.out, "all" if args.all else "train")
+    print(f"✅ Captcha model written to {args.out}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,202 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from sqlalchemy import Date, DateTime, insert, update
+from sqlalchemy.orm import Session
+from app.models.case import Case, CaseParty, CaseAct, CaseHistory, CaseOrder
+from app.services.storage import blobs
+
+# Refresh-time reconciliation of a case's child rows against freshly scraped data.
+# Rows are matched on natural keys; matched rows are updated in place (only when
+# a column actually changed), unmatched scraped items are inserted and leftover
+# rows deleted, each as one bulk statement per table.
+
+PARTY_FIELDS = ("is_petitioner", "name", "advocate", "role", "raw_text")
+ACT_FIELDS = ("act_name", "section", "act_code")
+HISTORY_FIELDS = ("business_date", "hearing_date", "purpose", "stage", "notes", "judge", "source")
+ORDER_FIELDS = ("order_no", "order_date", "order_details", "pdf_filename", "pdf_link_args")
+
+
+def _norm_text(value: Any) -> str:
+    return " ".join(str(value).split()).lower() if value else ""
+
+
+def party_key(p) -> Hashable:
+    return (bool(p["is_petitioner"]), _norm_text(p["name"]))
+
+
+def act_key(a) -> Hashable:
+    return _norm_text(a["act_name"])
+
+
+def history_key(h) -> Hashable:
+    return (h["hearing_date"], h["business_date"])
+
+
+def order_key(o) -> Hashable:
+    return (_norm_text(o["order_no"]), o["order_date"])
+
+
+def _coerce(model, field: str, value: Any) -> Any:
+    """Scraped data arrives JSON-shaped; bring dates back to what the column holds."""
+    if not isinstance(value, str):
+        return value
+    column_type = model.__table__.columns[field].type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Date):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _values(model, item: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    return {f: _coerce(model, f, item.get(f)) for f in fields}
+
+
+def _keyed(entries: List[Any], key_fn: Callable[[Any], Hashable]) -> Dict[Hashable, Any]:
+    # Repeated natural keys (e.g. two adjournments on one day) are told apart
+    # by their position among equals
+    seen: Dict[Hashable, int] = defaultdict(int)
+    keyed = {}
+    for entry in entries:
+        key = key_fn(entry)
+        keyed[(key, seen[key])] = entry
+        seen[key] += 1
+    return keyed
+
+
+class _RowView:
+    """Lets key functions read ORM rows and scraped dicts alike."""
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getitem__(self, field: str) -> Any:
+        return getattr(self.row, field)
+
+
+def match_rows(rows: List[Any], items: List[Dict[str, Any]], key_fn: Callable[[Any], Hashable]):
+    """Returns (matched [(row, item)], new items, stale rows)."""
+    existing = _keyed(rows, lambda r: key_fn(_RowView(r)))
+    incoming = _keyed(items, key_fn)
+
+    matched = [(existing[k], item) for k, item in incoming.items() if k in existing]
+    new_items = [item for k, item in incoming.items() if k not in existing]
+    stale = [row for k, row in existing.items() if k not in incoming]
+    return matched, new_items, stale
+
+
+def apply_changes(
+    db: Session,
+    model,
+    case_id,
+    matched: List[Tuple[Any, Dict[str, Any]]],
+    new_values: List[Dict[str, Any]],
+    stale: List[Any]
+) -> Dict[str, List[str]]:
+    """
+    Issues the bulk INSERT/UPDATE/DELETE for one child table.
+    `matched` pairs an existing row with the column values it should have.
+    Returns the ids touched, per operation.
+    """
+    updates: Dict[frozenset, List[Dict[str, Any]]] = defaultdict(list)
+    for row, values in matched:
+        changes = {f: v for f, v in values.items() if getattr(row, f) != v}
+        if changes:
+            updates[frozenset(changes)].append({"id": row.id, **changes})
+
+    inserts = [{"id": uuid.uuid4(), "case_id": case_id, **values} for values in new_values]
+
+    if stale:
+        db.query(model).filter(
+            model.id.in_([row.id for row in stale])
+        ).delete(synchronize_session=False)
+
+    # executemany needs the same columns in every parameter set
+    for params in updates.values():
+        db.execute(update(model), params)
+
+    if inserts:
+        db.execute(insert(model), inserts)
+
+    return {
+        "inserted": [str(p["id"]) for p in inserts],
+        "updated": [str(p["id"]) for params in updates.values() for p in params],
+        "deleted": [str(row.id) for row in stale],
+    }
+
+
+def _reconcile_simple(db: Session, model, case_id, rows, items, key_fn, fields):
+    items = [_values(model, item, fields) for item in items]
+    matched, new_items, stale = match_rows(rows, items, key_fn)
+    return apply_changes(db, model, case_id, matched, new_items, stale)
+
+
+def _reconcile_orders(db: Session, case_id, rows: List[CaseOrder], items: List[Dict[str, Any]]):
+    """
+    Orders also carry a stored PDF. Matched rows keep the blob they hold unless
+    the scrape brought a freshly downloaded one or the order now links to a
+    different document (order_key changed); new rows resolve (and take a
+    reference on) their file; deleted rows release theirs.
+    Returns (report, storage paths no longer referenced).
+    """
+    coerced = [{**item, **_values(CaseOrder, item, ORDER_FIELDS)} for item in items]
+    matched, new_items, stale = match_rows(rows, coerced, order_key)
+
+    matched_values = []
+    released = []
+    for row, item in matched:
+        values = {f: item[f] for f in ORDER_FIELDS}
+        fresh_sha = item.get("sha256") or blobs.sha_from_path(item.get("file_path"))
+
+        if fresh_sha and fresh_sha != row.blob_sha256:
+            values.update(blobs.resolve_order_file(db, item))
+            released.append(row)
+        elif not row.file_path:
+            values.update(blobs.resolve_order_file(db, item))
+        else:
+            key = blobs.order_key(item["order_no"], item["order_date"], item["pdf_link_args"])
+            if row.order_key and key != row.order_key:
+                # Same order, different document on eCourts (corrected / re-uploaded):
+                # drop the old PDF and reuse or lazily fetch the new one
+                values.update(blobs.resolve_order_file(db, item))
+                released.append(row)
+            else:
+                values["order_key"] = key
+
+        matched_values.append((row, values))
+
+    new_values = [
+        {**{f: item[f] for f in ORDER_FIELDS}, **blobs.resolve_order_file(db, item)}
+        for item in new_items
+    ]
+
+    unused_files = blobs.release_orders(db, released + stale)
+    report = apply_changes(db, CaseOrder, case_id, matched_values, new_values, stale)
+    return report, unused_files
+
+
+def reconcile_case_children(db: Session, case: Case, data: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, List[str]]], List[str]]:
+    """
+    Brings parties, acts, history and orders of `case` in line with `data`
+    (the structured scrape). Returns a per-table change report and the storage
+    paths to delete once the transaction commits.
+    """
+    def existing(model):
+        return db.query(model).filter(model.case_id == case.id).all()
+
+    report = {
+        "parties": _reconcile_simple(db, CaseParty, case.id, existing(CaseParty), data["parties"], party_key, PARTY_FIELDS),
+        "acts": _reconcile_simple(db, CaseAct, case.id, existing(CaseAct), data["acts"], act_key, ACT_FIELDS),
+        "history": _reconcile_simple(db, CaseHistory, case.id, existing(CaseHistory), data["history"], history_key, HISTORY_FIELDS),
+    }
+    report["orders"], unused_files = _reconcile_orders(db, case.id, existing(CaseOrder), data.get("orders", []))
+    return report, unused_files
+
+
+def summarize(report: Dict[str, Dict[str, List[str]]]) -> str:
+    return ", ".join(
+        f"{table} +{len(ops['inserted'])} ~{len(ops['updated'])} -{len(ops['deleted'])}"
+        for table, ops in report.items()
+    )
@@ -0,0 +1,118 @@
+import io
+from typing import List, Tuple
+import numpy as np
+from PIL import Image
+
+# Vectorised clean-up of eCourts (securimage) captchas before recognition.
+# Masks are boolean arrays with True = ink.
+
+PAD = 4
+
+
+def to_gray(image_bytes: bytes) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(image_bytes)).convert('L'), dtype=np.uint8)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    mean_bg = sum_bg / np.maximum(weight_bg, 1)
+    mean_fg = (sum_bg[-1] - sum_bg) / np.maximum(weight_fg, 1)
+
+    between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Dark text on a light background -> ink mask."""
+    return gray <= otsu_threshold(gray)
+
+
+def _shifted(mask: np.ndarray, dy: int, dx: int) -> np.ndarray:
+    out = np.zeros_like(mask)
+    h, w = mask.shape
+    out[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+        mask[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+    return out
+
+
+def erode(mask: np.ndarray) -> np.ndarray:
+    # 2x2 structuring element
+    return mask & _shifted(mask, 0, 1) & _shifted(mask, 1, 0) & _shifted(mask, 1, 1)
+
+
+def dilate(mask: np.ndarray, iterations: int = 1) -> np.ndarray:
+    for _ in range(iterations):
+        mask = mask | _shifted(mask, 0, -1) | _shifted(mask, -1, 0) | _shifted(mask, -1, -1)
+    return mask
+
+
+def remove_lines(mask: np.ndarray) -> np.ndarray:
+    """
+    Drops the thin noise lines securimage draws across the text.
+    A morphological opening removes anything narrower than the 2x2 element,
+    which the glyph strokes survive and the 1px lines do not.
+    """
+    return dilate(erode(mask))
+
+
+def segment(mask: np.ndarray, min_width: int = 3, max_gap: int = 1) -> List[Tuple[int, int]]:
+    """
+    Splits the mask into glyph column ranges [x0, x1) using the vertical
+    ink projection. Gaps of up to `max_gap` empty columns are bridged.
+    """
+    columns = mask.any(axis=0).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], columns, [0]))))
+    runs = list(zip(edges[0::2], edges[1::2]))
+
+    merged: List[Tuple[int, int]] = []
+    for x0, x1 in runs:
+        if merged and x0 - merged[-1][1] <= max_gap:
+            merged[-1] = (merged[-1][0], x1)
+        else:
+            merged.append((x0, x1))
+
+    return [(int(x0), int(x1)) for x0, x1 in merged if x1 - x0 >= min_width]
+
+
+def clean_mask(gray: np.ndarray) -> np.ndarray:
+    return remove_lines(binarize(gray))
+
+
+def glyphs(mask: np.ndarray) -> List[np.ndarray]:
+    """Tight crops of each segmented glyph."""
+    crops = []
+    for x0, x1 in segment(mask):
+        column = mask[:, x0:x1]
+        rows = np.flatnonzero(column.any(axis=1))
+        crops.append(column[rows[0]:rows[-1] + 1])
+    return crops
+
+
+def mask_to_image(mask: np.ndarray) -> Image.Image:
+    """Black glyphs on white with a small margin, as Tesseract prefers."""
+    canvas = np.pad(mask, PAD, constant_values=False)
+    return Image.fromarray(np.where(canvas, 0, 255).astype(np.uint8), mode='L')
+
+
+def preprocess(image_bytes: bytes, dilate_iterations: int = 0) -> Image.Image:
+    """
+    Threshold, strip noise lines, optionally thicken strokes and lay the
+    segmented glyphs out with even spacing.
+    """
+    mask = dilate(clean_mask(to_gray(image_bytes)), iterations=dilate_iterations)
+    spans = segment(mask)
+    if not spans:
+        return mask_to_image(mask)
+
+    # Re-assemble with uniform gaps so touching glyphs read as separate
+    height = mask.shape[0]
+    gap = np.zeros((height, PAD), dtype=bool)
+    parts = []
+    for x0, x1 in spans:
+        parts.extend([mask[:, x0:x1], gap])
+    return mask_to_image(np.hstack(parts[:-1]))
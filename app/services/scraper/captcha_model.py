@@ -0,0 +1,141 @@
+import uuid
+import hashlib
+from pathlib import Path
+from typing import Optional, List, Tuple, Dict
+import numpy as np
+from PIL import Image
+from app.core.config import settings
+from app.services.scraper import captcha
+from rich import print
+
+# CPU-only captcha recognition by template matching over segmented glyphs.
+# Training data comes from captchas eCourts accepted (see collect()), so the
+# model keeps improving as the scraper is used. Stored as a .npz with one
+# flattened, size-normalised glyph per row and its character, plus the ids
+# of the images it was trained on (so benchmarks can keep them out).
+
+GLYPH_SHAPE = (20, 16)  # rows, cols
+MAX_TEMPLATES_PER_CHAR = 64
+
+_model: Optional["TemplateClassifier"] = None
+_model_mtime: Optional[float] = None
+
+
+def collect(image_bytes: bytes, text: str):
+    """Stores an accepted captcha as <text>_<id>.png (benchmark corpus layout)."""
+    if not settings.CAPTCHA_COLLECT_DIR or not text or not text.isalnum():
+        return
+    try:
+        folder = Path(settings.CAPTCHA_COLLECT_DIR)
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"{text}_{uuid.uuid4().hex[:8]}.png").write_bytes(image_bytes)
+    except Exception as e:
+        print(f"[bold bright_cyan]OCR[/bold bright_cyan]: [bold yellow]WARN[/bold yellow]: Failed to collect captcha: {e}")
+
+
+def sample_id(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def glyph_vectors(image_bytes: bytes) -> np.ndarray:
+    """Segments a captcha and returns one normalised vector per glyph."""
+    crops = captcha.glyphs(captcha.clean_mask(captcha.to_gray(image_bytes)))
+    if not crops:
+        return np.zeros((0, GLYPH_SHAPE[0] * GLYPH_SHAPE[1]), dtype=np.float32)
+
+    vectors = []
+    for crop in crops:
+        img = Image.fromarray(crop.astype(np.uint8) * 255, mode='L')
+        img = img.resize((GLYPH_SHAPE[1], GLYPH_SHAPE[0]), Image.BILINEAR)
+        vectors.append(np.asarray(img, dtype=np.float32).ravel() / 255.0)
+    return np.stack(vectors)
+
+
+def train(samples: List[Tuple[str, bytes]]) -> Tuple["TemplateClassifier", Dict[str, int]]:
+    """
+    Builds templates from (text, image) pairs. Samples whose glyph count
+    doesn't match their text length are skipped, since glyphs can't be
+    paired with characters reliably.
+    """
+    per_char: Dict[str, List[np.ndarray]] = {}
+    used = skipped = 0
+
+    for text, image_bytes in samples:
+        vectors = glyph_vectors(image_bytes)
+        if len(vectors) != len(text):
+            skipped += 1
+            continue
+        used += 1
+        for char, vector in zip(text, vectors):
+            bucket = per_char.setdefault(char, [])
+            if len(bucket) < MAX_TEMPLATES_PER_CHAR:
+                bucket.append(vector)
+
+    labels = [c for c, vs in per_char.items() for _ in vs]
+    templates = [v for vs in per_char.values() for v in vs]
+    model = TemplateClassifier(
+        np.stack(templates) if templates else np.zeros((0, GLYPH_SHAPE[0] * GLYPH_SHAPE[1]), dtype=np.float32),
+        np.array(labels),
+        np.array(sorted({sample_id(image_bytes) for _, image_bytes in samples}))
+    )
+    return model, {"used": used, "skipped": skipped, "chars": len(per_char), "templates": len(labels)}
+
+
+class TemplateClassifier:
+
+    def __init__(self, templates: np.ndarray, labels: np.ndarray, trained_on: Optional[np.ndarray] = None):
+        self.templates = templates.astype(np.float32)
+        self.labels = labels
+        # sample_id() of every training image; None for models saved before it was recorded
+        self.trained_on = trained_on
+        self._norms = (self.templates ** 2).sum(axis=1)
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateClassifier":
+        data = np.load(path)
+        trained_on = data["trained_on"] if "trained_on" in data.files else None
+        return cls(data["templates"], data["labels"], trained_on)
+
+    def save(self, path: str):
+        extra = {} if self.trained_on is None else {"trained_on": self.trained_on}
+        np.savez_compressed(path, templates=self.templates, labels=self.labels, **extra)
+
+    def predict(self, image_bytes: bytes) -> str:
+        if not len(self.templates):
+            return ""
+        vectors = glyph_vectors(image_bytes)
+        if not len(vectors):
+            return ""
+
+        # Squared euclidean distance of every glyph to every template at once
+        distances = (
+            (vectors ** 2).sum(axis=1)[:, None]
+            - 2 * vectors @ self.templates.T
+            + self._norms[None, :]
+        )
+        return "".join(self.labels[distances.argmin(axis=1)])
+
+
+def get_model() -> Optional[TemplateClassifier]:
+    """The trained model, reloaded when the file on disk changes."""
+    global _model, _model_mtime
+    path = Path(settings.CAPTCHA_MODEL_PATH)
+    if not path.exists():
+        return None
+
+    mtime = path.stat().st_mtime
+    if _model is None or mtime != _model_mtime:
+        _model = TemplateClassifier.load(str(path))
+        _model_mtime = mtime
+    return _model
+
+
+def predict(image_bytes: bytes) -> str:
+    model = get_model()
+    if model is None:
+        return ""
+    try:
+        return model.predict(image_bytes)
+    except Exception as e:
+        print(f"[bold bright_cyan]OCR[/bold bright_cyan]: [bold red]ERROR[/bold red]: Template solve failed: {e}")
+        return ""
@@ -0,0 +1,210 @@
+import json
+import base64
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Literal, get_args
+from app.core.config import settings
+from app.services.scraper.processor import split_case_number
+
+# In-memory query index over a search session's case list (the rows stored by
+# flows.index_case_list). Built once per search per process; a search's list
+# never changes, so a position in a filtered, sorted view is a stable cursor.
+
+SortKey = Literal["index", "case_number", "year", "petitioner", "respondent"]
+SORT_KEYS = get_args(SortKey)
+
+_indexes: "OrderedDict[str, Tuple[Optional[str], CaseListIndex]]" = OrderedDict()
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _text(value) -> str:
+    return (value or "").lower()
+
+
+class CaseListIndex:
+
+    def __init__(self, case_list: Dict[str, Dict[str, Any]]):
+        self.rows: List[Dict[str, Any]] = []
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_year: Dict[int, List[int]] = {}
+        self.by_court: Dict[str, List[int]] = {}
+
+        for key, row in case_list.items():
+            case_type, case_no, year = split_case_number(row["case_number"])
+            pos = len(self.rows)
+            self.rows.append({
+                "index": int(key),
+                "display": row["display"],
+                "case_number": row["case_number"],
+                "case_type": case_type,
+                "case_no": case_no,
+                "year": year,
+                "petitioner": row["petitioner"],
+                "respondent": row["respondent"],
+                "court": row.get("court"),
+                "args": row["args"],
+                # Lists indexed before the raw onclick was kept get it rebuilt
+                "onclick": row.get("onclick") or "viewHistory(" + ",".join(f"'{a}'" for a in row["args"]) + ")",
+            })
+            self.by_type.setdefault(_text(case_type), []).append(pos)
+            if year:
+                self.by_year.setdefault(year, []).append(pos)
+            if row.get("court"):
+                self.by_court.setdefault(row["court"], []).append(pos)
+
+        self._petitioners = [_text(r["petitioner"]) for r in self.rows]
+        self._respondents = [_text(r["respondent"]) for r in self.rows]
+        self._orders: Dict[str, List[int]] = {}
+
+    def _order(self, sort: str) -> List[int]:
+        if sort not in self._orders:
+            rows = self.rows
+            if sort == "case_number":
+                key = lambda p: (_text(rows[p]["case_type"]), rows[p]["year"] or 0, int(rows[p]["case_no"]) if (rows[p]["case_no"] or "").isdigit() else 0)
+            elif sort == "year":
+                key = lambda p: (rows[p]["year"] or 0, rows[p]["index"])
+            elif sort in ("petitioner", "respondent"):
+                key = lambda p: _text(rows[p][sort])
+            else:
+                key = lambda p: rows[p]["index"]
+            self._orders[sort] = sorted(range(len(rows)), key=key)
+        return self._orders[sort]
+
+    def facets(self, window: int) -> Dict[str, List[Any]]:
+        """Filter values present in the first `window` rows."""
+        return {
+            "case_types": sorted({r["case_type"] for r in self.rows[:window] if r["case_type"]}),
+            "years": sorted({r["year"] for r in self.rows[:window] if r["year"]}, reverse=True),
+            "courts": [c for c, positions in self.by_court.items() if positions[0] < window],
+        }
+
+    def query(
+        self,
+        window: int,
+        case_type: Optional[str] = None,
+        year: Optional[int] = None,
+        court: Optional[str] = None,
+        party: Optional[str] = None,
+        petitioner: Optional[str] = None,
+        respondent: Optional[str] = None,
+        sort: str = "index",
+        descending: bool = False,
+    ) -> List[int]:
+        """Row positions matching every given filter, in `sort` order."""
+        candidates = set(range(min(window, len(self.rows))))
+
+        if case_type:
+            candidates.intersection_update(self.by_type.get(case_type.lower(), ()))
+        if year:
+            candidates.intersection_update(self.by_year.get(year, ()))
+        if court:
+            needle = court.lower()
+            matched = set()
+            for name, positions in self.by_court.items():
+                if needle in name.lower():
+                    matched.update(positions)
+            candidates &= matched
+
+        # Substring filters scan only what the indexed filters left
+        if petitioner:
+            needle = petitioner.lower()
+            candidates = {p for p in candidates if needle in self._petitioners[p]}
+        if respondent:
+            needle = respondent.lower()
+            candidates = {p for p in candidates if needle in self._respondents[p]}
+        if party:
+            needle = party.lower()
+            candidates = {p for p in candidates if needle in self._petitioners[p] or needle in self._respondents[p]}
+
+        order = self._order(sort)
+        if descending:
+            order = reversed(order)
+        return [p for p in order if p in candidates]
+
+
+def cached_index(session_id: str, version: Optional[str]) -> Optional[CaseListIndex]:
+    """The session's index if this process already built it for `version`."""
+    cached = _indexes.get(session_id)
+    if cached and cached[0] == version:
+        _indexes.move_to_end(session_id)
+        return cached[1]
+    return None
+
+
+def get_index(session_id: str, version: Optional[str], case_list: Dict[str, Dict[str, Any]]) -> CaseListIndex:
+    """The session's index, rebuilt when its list changes (a new search)."""
+    cached = cached_index(session_id, version)
+    if cached:
+        return cached
+
+    index = CaseListIndex(case_list)
+    _indexes[session_id] = (version, index)
+    _indexes.move_to_end(session_id)
+    while len(_indexes) > settings.CASE_LIST_INDEX_CACHE_SIZE:
+        _indexes.popitem(last=False)
+    return index
+
+
+# ---- Cursors ----
+# Opaque to clients: the offset into the filtered view, bound to the list
+# version and the query it was issued for.
+
+def _query_hash(version: Optional[str], query: Dict[str, Any]) -> str:
+    raw = json.dumps([version, query], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def encode_cursor(offset: int, version: Optional[str], query: Dict[str, Any]) -> str:
+    raw = json.dumps({"o": offset, "q": _query_hash(version, query)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: Optional[str], query: Dict[str, Any]) -> int:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+    if data.get("q") != _query_hash(version, query) or offset < 0:
+        raise InvalidCursorError("Cursor does not match this search or filters")
+    return offset
+
+
+def paginate(
+    index: CaseListIndex,
+    version: Optional[str],
+    window: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    **query,
+) -> Dict[str, Any]:
+    query = {k: v for k, v in query.items() if v not in (None, "")}
+    key = {**query, "window": window}
+
+    offset = decode_cursor(cursor, version, key) if cursor else 0
+    positions = index.query(window, **query)
+    page = positions[offset:offset + limit]
+    next_offset = offset + len(page)
+
+    return {
+        "cases": [
+            {
+                "index": row["index"],
+                "display": row["display"],
+                "case_number": row["case_number"],
+                "case_type": row["case_type"],
+                "year": row["year"],
+                "petitioner": row["petitioner"],
+                "respondent": row["respondent"],
+                "court": row["court"],
+                "onclick": row["onclick"],
+            }
+            for row in (index.rows[p] for p in page)
+        ],
+        "total": len(positions),
+        "next_cursor": encode_cursor(next_offset, version, key) if next_offset < len(positions) else None,
+        "facets": index.facets(window),
+    }
@@ -1,9 +1,13 @@
 import re
 import time
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from app.services.scraper.utils import make_soup
+from app.services.scraper.processor import parse_business_html
 from typing import Optional, Dict, Tuple
 from app.core.config import settings
+from app.services.scraper.transport import build_http_client
+from app.services.scraper.errors import RetryableError
+import httpx
 from rich import print
 
 # Use settings for Base URL
@@ -42,16 +46,36 @@ def clean_text(text):
     if not text: return ""
     return " ".join(text.split())
 
+RETRYABLE_EXCEPTIONS = (
+    httpx.TransportError,
+    RetryableError,
+)
+
+async def retry_request(func, *args, attempts=3, delay=1, **kwargs):
+    last_exception = None
+
+    for attempt in range(attempts):
+        try:
+            return await func(*args, **kwargs)
+        except RETRYABLE_EXCEPTIONS as e:
+            print(f"[bold red]REQUEST RETRY[/bold red]: Attempt {attempt+1} failed: {e}")
+            last_exception = e
+            await asyncio.sleep(delay)
+
+    raise last_exception
+
 class ECourtsClient:
     def __init__(self, cookies: Optional[Dict] = None, current_token: Optional[str] = None):
-        self.session = requests.Session()
-        self.session.headers.update(HEADERS)
-        if cookies:
-            self.session.cookies.update(cookies)
+        # Per-scrape cookie jar + token; connections come from the shared pool
+        self.http = build_http_client(HEADERS, cookies)
         self.current_token = current_token
 
     def get_cookies(self) -> Dict:
-        return self.session.cookies.get_dict()
+        # Flatten the jar like requests' get_dict() (last cookie wins on name clash)
+        return {c.name: c.value for c in self.http.cookies.jar}
+
+    async def aclose(self):
+        await self.http.aclose()
 
     def _update_token(self, response):
         """Internal method to update token if present in response."""
@@ -60,7 +84,14 @@ class ECourtsClient:
             self.current_token = new_token
             print(f"[bold green]TOKEN: Token updated in client to: '{self.current_token}'[/bold green]")
 
-    def _post(self, endpoint, data):
+    async def _get(self, url, drop_headers=("X-Requested-With", "Content-Type")):
+        """GET without the AJAX-only headers (page loads, images, PDFs)."""
+        request = self.http.build_request("GET", url)
+        for name in drop_headers:
+            request.headers.pop(name, None)
+        return await self.http.send(request)
+
+    async def _post(self, endpoint, data):
         """Wrapper for POST requests with auto token injection and update."""
         url = f"{BASE_URL}/?p={endpoint}"
         
@@ -72,7 +103,7 @@ class ECourtsClient:
 
         print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: POST {endpoint} | Token: '{data.get('app_token')[:10] if data.get('app_token') is not None else 'None'}'")
         
-        resp = self.session.post(url, data=data)
+        resp = await self.http.post(url, data=data)
         self._update_token(resp)
         return resp
 
@@ -100,7 +131,7 @@ class ECourtsClient:
     #     print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: Initial Token: {self.current_token[:10] if self.current_token else 'None'}")
     #     return self.current_token, resp.text
 
-    def get_initial_token(self) -> Tuple[Optional[str], str]:
+    async def get_initial_token(self) -> Tuple[Optional[str], str]:
         """Loads homepage to get the first session token with retry."""
 
         url = f"{BASE_URL}/?p=casestatus/index"
@@ -109,20 +140,16 @@ class ECourtsClient:
 
         for attempt in range(1, max_retries + 1):
 
-            # Remove ajax headers for page load
-            page_headers = self.session.headers.copy()
-            page_headers.pop("X-Requested-With", None)
-            page_headers.pop("Content-Type", None)
-
             print(
                 f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: "
                 f"GET Initial {url} (attempt {attempt}/{max_retries})"
             )
 
-            resp = self.session.get(url, headers=page_headers)
+            # Remove ajax headers for page load
+            resp = await self._get(url)
 
             # print(resp.text)
-            soup = BeautifulSoup(resp.text, "html.parser")
+            soup = make_soup(resp.text)
             token_input = soup.find("input", {"name": "app_token"})
 
             token = None
@@ -151,7 +178,7 @@ class ECourtsClient:
             )
 
             if attempt < max_retries:
-                time.sleep(delay_seconds)
+                await asyncio.sleep(delay_seconds)
 
         # If all retries fail
         print(
@@ -162,23 +189,18 @@ class ECourtsClient:
         self.current_token = None
         return None, resp.text
 
-    def get_captcha(self) -> bytes:
+    async def get_captcha(self) -> bytes:
         """Triggers generation and downloads image."""
-        self._post('casestatus/getCaptcha', {})
+        await self._post('casestatus/getCaptcha', {})
         
         timestamp = int(time.time() * 1000)
         img_url = f"{BASE_URL}/vendor/securimage/securimage_show.php?{timestamp}"
         
-        # Download headers
-        img_headers = self.session.headers.copy()
-        if 'Content-Type' in img_headers: del img_headers['Content-Type']
-        if 'X-Requested-With' in img_headers: del img_headers['X-Requested-With']
-        
         print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: GET Captcha Image")
         # Trigger
-        self.session.get(img_url, headers=img_headers)
+        await self._get(img_url)
         # Download
-        resp = self.session.get(img_url, headers=img_headers)
+        resp = await self._get(img_url)
         
         # Sometimes eCourts sends text/html error instead of image
         if 'text/html' in resp.headers.get('Content-Type', ''):
@@ -186,76 +208,115 @@ class ECourtsClient:
 
         return resp.content
 
-    def get_districts(self, state_code):
-        return self._post('casestatus/fillDistrict', {'state_code': state_code})
+    async def get_districts(self, state_code):
+        return await self._post('casestatus/fillDistrict', {'state_code': state_code})
 
-    def get_complexes(self, state_code, dist_code):
-        return self._post('casestatus/fillcomplex', {'state_code': state_code, 'dist_code': dist_code})
+    async def get_complexes(self, state_code, dist_code):
+        return await self._post('casestatus/fillcomplex', {'state_code': state_code, 'dist_code': dist_code})
 
-    def set_data(self, state, dist, complex_code):
+    async def set_data(self, state, dist, complex_code):
         # Ensure complex code suffix is correct
         formatted_code = complex_code if '@' in complex_code else f"{complex_code}@1@N"
-        return self._post('casestatus/set_data', {
+        return await self._post('casestatus/set_data', {
             'complex_code': formatted_code,
             'selected_state_code': state,
             'selected_dist_code': dist,
             'selected_est_code': 'null'
         })
     
-    def search_party(self, params):
-        return self._post('casestatus/submitPartyName', params)
+    async def search_party(self, params):
+        return await self._post('casestatus/submitPartyName', params)
 
-    def search_advocate(self, params):
-        return self._post('casestatus/submitAdvName', params)
+    async def search_advocate(self, params):
+        return await self._post('casestatus/submitAdvName', params)
 
-    def search_cnr(self, params):
-        return self._post('cnr_status/searchByCNR', params)
+    async def search_cnr(self, params):
+        return await self._post('cnr_status/searchByCNR', params)
 
-    def view_history(self, params):
+    async def view_history(self, params):
         """Used when selecting a specific case from Party/Advocate search results."""
-        return self._post('home/viewHistory', params)
+        return await self._post('home/viewHistory', params)
 
-    def view_business(self, params):
-        resp = self._post('home/viewBusiness', params)
+    async def view_business(self, params):
+        resp = await self._post('home/viewBusiness', params)
         try:
             data = resp.json()
         except:
             return "N/A"
             
-        html_content = data.get('data_list', '')
-        
-        if not html_content: return "N/A"
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        # Logic to find the correct business date column
-        business_td = soup.find(lambda tag: tag.name == "td" and "Business" in tag.text and "Date" not in tag.text)
-        
-        result_text = clean_text(soup.text)
-        if business_td:
-            row = business_td.find_parent('tr')
-            cells = row.find_all('td')
-            if len(cells) >= 3:
-                result_text = clean_text(cells[2].text)
-        return result_text
-
-    def display_pdf(self, params):
+        return parse_business_html(data.get('data_list', ''))
+
+    async def display_pdf(self, params):
         """Triggers PDF generation on server."""
-        return self._post('home/display_pdf', params)
+        return await self._post('home/display_pdf', params)
 
-    def get_pdf_bytes(self):
-        """Downloads the generated PDF using session ID."""
-        sess_id = self.session.cookies.get('SERVICES_SESSID') or self.session.cookies.get('PHPSESSID')
-        if not sess_id:
-             c = self.session.cookies.get_dict()
-             sess_id = c.get('SERVICES_SESSID') or c.get('PHPSESSID')
-             
+    def _pdf_report_url(self) -> Optional[str]:
+        c = self.get_cookies()
+        sess_id = c.get('SERVICES_SESSID') or c.get('PHPSESSID')
         if not sess_id: return None
+        return f"{BASE_URL}/reports/{sess_id}.pdf"
 
-        pdf_url = f"{BASE_URL}/reports/{sess_id}.pdf"
-        pdf_headers = self.session.headers.copy()
-        if 'X-Requested-With' in pdf_headers: del pdf_headers['X-Requested-With']
-        
-        resp = self.session.get(pdf_url, headers=pdf_headers)
+    async def get_pdf_bytes(self):
+        """Downloads the generated PDF using session ID."""
+        pdf_url = self._pdf_report_url()
+        if not pdf_url: return None
+
+        resp = await self._get(pdf_url, drop_headers=('X-Requested-With',))
         if resp.status_code == 200 and b'%PDF' in resp.content:
             return resp.content
         return None
+
+    async def open_pdf_stream(self) -> Optional[httpx.Response]:
+        """
+        Opens a streaming GET on the generated PDF.
+        The caller must aclose() the returned response.
+        """
+        pdf_url = self._pdf_report_url()
+        if not pdf_url: return None
+
+        request = self.http.build_request("GET", pdf_url)
+        request.headers.pop('X-Requested-With', None)
+        resp = await self.http.send(request, stream=True)
+        if resp.status_code != 200:
+            await resp.aclose()
+            return None
+        return resp
+
+    async def _head(self, url):
+        request = self.http.build_request("HEAD", url)
+        request.headers.pop("X-Requested-With", None)
+        return await self.http.send(request)
+
+    async def wait_for_pdf(self, timeout: float, initial_delay: float, max_delay: float) -> bool:
+        """
+        Polls the report URL until the generated PDF is ready.
+        Uses HEAD while the server honours it (full GETs otherwise),
+        backing off exponentially. Returns False on timeout.
+        """
+        pdf_url = self._pdf_report_url()
+        if not pdf_url: return False
+
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        use_head = True
+
+        while True:
+            if use_head:
+                resp = await self._head(pdf_url)
+                if resp.status_code in (405, 501):
+                    # HEAD not supported; poll with GET from now on
+                    use_head = False
+                    continue
+
+                content_type = resp.headers.get('Content-Type', '')
+                if resp.status_code == 200 and 'text/html' not in content_type:
+                    return True
+
+            elif await self.get_pdf_bytes() is not None:
+                return True
+
+            if time.monotonic() + delay > deadline:
+                return False
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
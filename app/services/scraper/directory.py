@@ -0,0 +1,210 @@
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from app.core.redis import get_redis
+from app.core.config import settings
+from app.services.scraper.client import ECourtsClient
+from app.services.scraper.utils import parse_options_html, make_soup
+from app.services.scraper.errors import ECourtsError
+from rich import print
+
+# Court hierarchy cache (states -> districts -> complexes).
+# Lookups go: in-process LRU -> Redis -> eCourts. Entries older than
+# COURT_DIR_FRESH_TTL are still served but trigger a background refresh.
+KEY_PREFIX = "court_dir"
+
+
+def states_key() -> str:
+    return f"{KEY_PREFIX}:states"
+
+
+def districts_key(state_code: str) -> str:
+    return f"{KEY_PREFIX}:districts:{state_code}"
+
+
+def complexes_key(state_code: str, dist_code: str) -> str:
+    return f"{KEY_PREFIX}:complexes:{state_code}:{dist_code}"
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+_local = LRUCache(settings.COURT_DIR_LRU_SIZE)
+_revalidating: set = set()
+_revalidate_tasks: set = set()
+
+
+# ---- Upstream fetchers ----
+
+async def fetch_states(client: Optional[ECourtsClient] = None) -> List[Dict[str, str]]:
+    client = client or ECourtsClient()
+    _, home_html = await client.get_initial_token()
+    if not home_html:
+        raise ECourtsError("ECOURTS_UNAVAILABLE")
+
+    soup = make_soup(home_html)
+    state_select = soup.find('select', id='sess_state_code')
+    if not state_select:
+        raise ECourtsError("ECOURTS_UNAVAILABLE")
+
+    return parse_options_html(str(state_select))
+
+
+async def fetch_districts(state_code: str, client: Optional[ECourtsClient] = None) -> List[Dict[str, str]]:
+    if client is None:
+        client = ECourtsClient()
+        await client.get_initial_token()
+    resp = await client.get_districts(state_code)
+    return parse_options_html(resp.text)
+
+
+async def fetch_complexes(state_code: str, dist_code: str, client: Optional[ECourtsClient] = None) -> List[Dict[str, str]]:
+    if client is None:
+        client = ECourtsClient()
+        await client.get_initial_token()
+    resp = await client.get_complexes(state_code, dist_code)
+    return parse_options_html(resp.text)
+
+
+# ---- Cache plumbing ----
+
+async def _store(key: str, items: List[Dict[str, str]]) -> Dict[str, Any]:
+    entry = {"items": items, "fetched_at": time.time()}
+    _local.set(key, entry)
+    redis = await get_redis()
+    await redis.setex(key, settings.COURT_DIR_MAX_AGE, json.dumps(entry))
+    return entry
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    return time.time() - entry["fetched_at"] < settings.COURT_DIR_FRESH_TTL
+
+
+async def _revalidate(key: str, fetcher: Callable[[], Awaitable[List[Dict[str, str]]]]):
+    try:
+        # Another worker may already have refreshed Redis
+        redis = await get_redis()
+        raw = await redis.get(key)
+        if raw:
+            entry = json.loads(raw)
+            if _is_fresh(entry):
+                _local.set(key, entry)
+                return
+
+        items = await fetcher()
+        if items:
+            await _store(key, items)
+    except Exception as e:
+        print(f"[bold cyan]COURT DIR[/bold cyan]: [bold yellow]WARN[/bold yellow]: Revalidate failed for {key}: {e}")
+    finally:
+        _revalidating.discard(key)
+
+
+def _schedule_revalidate(key: str, fetcher):
+    if key in _revalidating:
+        return
+    _revalidating.add(key)
+    # The loop only keeps weak references to tasks: hold them until done
+    task = asyncio.create_task(_revalidate(key, fetcher))
+    _revalidate_tasks.add(task)
+    task.add_done_callback(_revalidate_tasks.discard)
+
+
+async def _get_cached(key: str, fetcher) -> List[Dict[str, str]]:
+    entry = _local.get(key)
+
+    if entry is None:
+        redis = await get_redis()
+        raw = await redis.get(key)
+        if raw:
+            entry = json.loads(raw)
+            _local.set(key, entry)
+
+    if entry is None:
+        items = await fetcher()
+        if items:
+            await _store(key, items)
+        return items
+
+    if not _is_fresh(entry):
+        _schedule_revalidate(key, fetcher)
+
+    return entry["items"]
+
+
+# ---- Public API ----
+
+async def get_states() -> List[Dict[str, str]]:
+    return await _get_cached(states_key(), fetch_states)
+
+
+async def get_districts(state_code: str) -> List[Dict[str, str]]:
+    return await _get_cached(
+        districts_key(state_code),
+        lambda: fetch_districts(state_code)
+    )
+
+
+async def get_complexes(state_code: str, dist_code: str) -> List[Dict[str, str]]:
+    return await _get_cached(
+        complexes_key(state_code, dist_code),
+        lambda: fetch_complexes(state_code, dist_code)
+    )
+
+
+async def crawl(concurrency: int = 4) -> Dict[str, int]:
+    """
+    One-shot crawl of the whole state -> district -> complex tree.
+    Each state is walked on its own eCourts session.
+    """
+    states = await fetch_states()
+    await _store(states_key(), states)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    totals = {"states": len(states), "districts": 0, "complexes": 0, "failed": 0}
+
+    async def crawl_state(state: Dict[str, str]):
+        async with semaphore:
+            state_code = state["value"]
+            try:
+                client = ECourtsClient()
+                await client.get_initial_token()
+
+                districts = await fetch_districts(state_code, client)
+                if districts:
+                    await _store(districts_key(state_code), districts)
+                totals["districts"] += len(districts)
+
+                for district in districts:
+                    complexes = await fetch_complexes(state_code, district["value"], client)
+                    if complexes:
+                        await _store(complexes_key(state_code, district["value"]), complexes)
+                    totals["complexes"] += len(complexes)
+
+                print(f"[bold cyan]COURT DIR[/bold cyan]: {state['text']}: {len(districts)} districts")
+            except Exception as e:
+                totals["failed"] += 1
+                print(f"[bold cyan]COURT DIR[/bold cyan]: [bold red]ERROR[/bold red]: Failed to crawl state {state_code}: {e}")
+
+    await asyncio.gather(*(crawl_state(s) for s in states))
+    return totals
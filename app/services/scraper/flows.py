@@ -1,69 +1,47 @@
+import time
 import asyncio
-from typing import Dict, Any, Optional
-from fastapi.concurrency import run_in_threadpool
+import base64
+import uuid
+from collections import deque
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 
 from app.services.scraper.session import ScraperSession, STATE_INIT, STATE_CAPTCHA_REQUIRED, STATE_CAPTCHA_SUBMITTED, STATE_SEARCH_SUBMITTED, STATE_HISTORY_FETCHED, STATE_FAILED, STATE_COMPLETED, STATE_CASE_LIST_LOADED
-import re
-from bs4 import BeautifulSoup
-from app.services.scraper.client import ECourtsClient
-from app.services.scraper.processor import sanitize_html, extract_css_links, parse_full_case_data, clean_text
+from app.services.scraper.client import ECourtsClient, retry_request
+from app.services.scraper.processor import extract_case, compute_fingerprint, parse_case_list, parse_onclick_args
 from app.services.scraper.transformer import transform_to_schema
-from app.services.scraper.errors import TokenError, CaptchaError, RetryableError
-from app.services.scraper.ocr import solve_captcha
+from app.services.scraper.errors import TokenError, CaptchaError
+from app.services.scraper import ocr, captcha_model
+from app.services.scraper import warm_pool, case_list as case_list_index
+from app.services.scraper.pdfs import fetch_order_pdf, fetch_order_pdfs, has_pdf_link, select_prefetch_orders
 from app.services.storage import get_storage
-import requests
-from http.client import RemoteDisconnected
+from app.core.config import settings
+from app.core.redis import get_redis
 
 from rich import print
 
-RETRYABLE_EXCEPTIONS = (
-    requests.exceptions.ConnectionError,
-    requests.exceptions.Timeout,
-    RemoteDisconnected,
-    RetryableError,
-)
-
-async def retry_request(func, *args, attempts=3, delay=1, **kwargs):
-    last_exception = None
-
-    for attempt in range(attempts):
-        try:
-            return await run_in_threadpool(func, *args, **kwargs)
-        except RETRYABLE_EXCEPTIONS as e:
-            print(f"[bold red]REQUEST RETRY[/bold red]: Attempt {attempt+1} failed: {e}")
-            last_exception = e
-            await asyncio.sleep(delay)
-
-    raise last_exception
-
-VS_PATTERN = re.compile(r'(?i)(?:\s*)(?:v\/?s\.?|vs\.?|v\.)(?:\s*)')
-
-def split_parties(raw_parties: str):
-    parts = VS_PATTERN.split(raw_parties, maxsplit=1)
-
-    if len(parts) != 2:
-        return {
-            "petitioner": raw_parties.strip(),
-            "respondent": None,
-            "error": "Could not split parties"
-        }
-
-    petitioner = parts[0].strip()
-    respondent = parts[1].strip()
-
-    return {
-        "petitioner": petitioner,
-        "respondent": respondent
-    }
-
-
 async def start_session(search_mode: str, payload: Dict[str, Any]) -> str:
     session = await ScraperSession.create(search_mode, payload)
-    
-    # Run initial token fetch in threadpool
+
+    # Fast path: take a pre-tokenised session from the warm pool
+    try:
+        pooled = await warm_pool.acquire()
+    except Exception as e:
+        print(f"[bold cyan]WARM POOL[/bold cyan]: [bold yellow]WARN[/bold yellow]: acquire failed: {e}")
+        pooled = None
+
+    if pooled is not None:
+        session.app_token = pooled["app_token"]
+        session.cookies = pooled["cookies"]
+        if pooled.get("captcha"):
+            session.data["prefetched_captcha"] = pooled["captcha"]
+            session.mark_dirty("prefetched_captcha")
+        session.state = STATE_CAPTCHA_REQUIRED
+        await session.save()
+        return session.session_id
+
     try:
         client = ECourtsClient()
-        token, _ = await run_in_threadpool(client.get_initial_token)
+        token, _ = await client.get_initial_token()
     except Exception as e:
         session.set_error(f"Failed to obtain initial token: {e}")
         await session.save()
@@ -84,21 +62,43 @@ async def start_session(search_mode: str, payload: Dict[str, Any]) -> str:
 
 async def get_captcha(session_id: str) -> bytes:
     session = await ScraperSession.get(session_id)
+
+    # Captcha already fetched by the warm pool; serve it once
+    prefetched = session.data.pop("prefetched_captcha", None)
+    if prefetched:
+        if settings.CAPTCHA_COLLECT_DIR:
+            session.data["last_captcha"] = prefetched
+        session.mark_dirty("prefetched_captcha", "last_captcha")
+        await session.save()
+        return base64.b64decode(prefetched)
     
     client = ECourtsClient(cookies=session.cookies, current_token=session.app_token)
-    img_bytes = await run_in_threadpool(client.get_captcha)
+    img_bytes = await client.get_captcha()
     
     # Update session cookies/token in case they changed
     session.cookies = client.get_cookies()
     if client.current_token:
         session.app_token = client.current_token
+
+    # Kept so an accepted answer can be stored as a training sample
+    if settings.CAPTCHA_COLLECT_DIR:
+        session.data["last_captcha"] = base64.b64encode(img_bytes).decode()
+        session.mark_dirty("last_captcha")
         
     await session.save()
     return img_bytes
 
+def _collect_accepted_captcha(session: ScraperSession, captcha_code: str):
+    last_captcha = session.data.pop("last_captcha", None)
+    if last_captcha:
+        session.mark_dirty("last_captcha")
+        captcha_model.collect(base64.b64decode(last_captcha), captcha_code)
+
 async def submit_captcha(session_id: str, captcha_code: str):
-    session = await ScraperSession.get(session_id)
+    async with ScraperSession.open(session_id) as session:
+        await _submit_captcha(session, captcha_code)
 
+async def _submit_captcha(session: ScraperSession, captcha_code: str):
     session.update_payload({"fcaptcha_code": captcha_code})
 
     client = ECourtsClient(
@@ -174,6 +174,9 @@ async def submit_captcha(session_id: str, captcha_code: str):
             if "Invalid Captcha" in str(result_json):
                 raise CaptchaError("Invalid Captcha")
 
+            # eCourts took the captcha: keep it as a labelled sample
+            _collect_accepted_captcha(session, captcha_code)
+
             if "No Record Found" in str(result_json):
                 session.state = STATE_FAILED
                 session.set_error("No Record Found")
@@ -189,7 +192,7 @@ async def submit_captcha(session_id: str, captcha_code: str):
             if mode == 'cnr' and html_content:
                 session.update_payload({"result_html": html_content})
                 session.state = STATE_SEARCH_SUBMITTED
-                await session.save()
+                await session.save(clear_result=True)
                 return
 
             list_html = (
@@ -198,7 +201,12 @@ async def submit_captcha(session_id: str, captcha_code: str):
             )
 
             if mode in ['party', 'advocate'] and list_html:
-                session.update_payload({"list_html": list_html})
+                session.update_payload({
+                    "list_html": list_html,
+                    "case_list": index_case_list(list_html),
+                    "case_list_id": uuid.uuid4().hex,
+                    "selected_html": {}
+                })
                 session.state = STATE_CASE_LIST_LOADED
                 await session.save()
                 return
@@ -217,123 +225,238 @@ async def submit_captcha(session_id: str, captcha_code: str):
                 raise
             await asyncio.sleep(1)
 
-async def fetch_results(session_id: str) -> Dict[str, Any]:
+# ---- Business detail fetching ----
+# viewBusiness chains app_token from one response to the next, so a single
+# eCourts session must be driven sequentially. To parallelise, rows are
+# sharded across several independent sessions (the scrape session plus spare
+# warm-pool ones), each walking its shard in order. Small cases, and any time
+# the pool is low, stay on the scrape session: cold-starting a session costs
+# more than the handful of rows it would take over.
+
+BUSINESS_FETCH_SEMAPHORE = asyncio.Semaphore(settings.BUSINESS_FETCH_GLOBAL_LIMIT)
+
+# row["business_update"] of a row whose viewBusiness call failed
+BUSINESS_FETCH_FAILED = "Failed to fetch"
+
+def build_business_payload(b_args):
+    # Construct payload as per reference
+    return {
+        'court_code': b_args[0], 
+        'state_code': b_args[4] if len(b_args) > 4 else '', 
+        'dist_code': 'undefined',
+        'case_number1': b_args[3] if len(b_args) > 3 else '', 
+        'disposal_flag': b_args[5] if len(b_args) > 5 else '', 
+        'businessDate': b_args[6] if len(b_args) > 6 else '',
+        'national_court_code': b_args[8] if len(b_args) > 8 else '', 
+        'court_no': b_args[7] if len(b_args) > 7 else '', 
+        'search_by': 'cnr', 
+        'srno': b_args[10] if len(b_args) > 10 else '0', 
+        'nextdate1': b_args[2] if len(b_args) > 2 else ''
+    }
+
+async def _fetch_business_shard(client: ECourtsClient, rows, on_row_done=None, on_row=None):
+    for row in rows:
+        try:
+            async with BUSINESS_FETCH_SEMAPHORE:
+                row["business_update"] = await retry_request(
+                    client.view_business,
+                    build_business_payload(row["business_link_args"]),
+                    attempts=3
+                )
+        except Exception as e:
+            print(f"[bold yellow]WARN[/bold yellow]: Failed to fetch business for row: {e}")
+            row["business_update"] = BUSINESS_FETCH_FAILED
+
+        if on_row_done is not None:
+            await on_row_done(client)
+        if on_row is not None:
+            await on_row(row)
+
+async def fetch_business_updates(session: ScraperSession, client: ECourtsClient, history_rows, on_row=None):
+    """
+    Fills row["business_update"] for every history row, in place.
+    Above BUSINESS_FETCH_SHARD_MIN_ROWS rows, they are spread over up to
+    BUSINESS_FETCH_SESSIONS eCourts sessions (as many as the warm pool can
+    spare); `on_row(row)` is awaited as each fetched row completes.
+    """
+    rows = []
+    for row in history_rows:
+        b_args = row.get("business_link_args")
+        if b_args and len(b_args) >= 9:
+            rows.append(row)
+        else:
+            row["business_update"] = "N/A"
+
+    if not rows:
+        return
+
+    extra_clients = []
+    if len(rows) > settings.BUSINESS_FETCH_SHARD_MIN_ROWS:
+        extra_clients = await warm_pool.open_spare_clients(min(settings.BUSINESS_FETCH_SESSIONS, len(rows)) - 1)
+
+    clients = [client] + extra_clients
+    shards = [rows[i::len(clients)] for i in range(len(clients))]
+
+    async def persist_primary(c: ECourtsClient):
+        # 🔥 CRITICAL FIX: keep the scrape session's token chain in sync
+        session.app_token = c.current_token
+        session.cookies = c.get_cookies()
+        await session.save()
+
+    print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: [bold bright_magenta]DEBUG[/bold bright_magenta]: Fetching {len(rows)} business rows over {len(clients)} sessions")
+
+    await asyncio.gather(
+        _fetch_business_shard(clients[0], shards[0], on_row_done=persist_primary, on_row=on_row),
+        *(_fetch_business_shard(c, shard, on_row=on_row) for c, shard in zip(clients[1:], shards[1:]))
+    )
+
+
+# ---- Result building ----
+# stream_results builds the result step by step and yields (event, data) as
+# each part becomes available; fetch_results runs it to completion. Events:
+#   "metadata"  parsed case page (history rows without business text yet),
+#               sanitised HTML and CSS links
+#   "business"  {"row", "business_update"} for each history row as it arrives
+#   "order"     {"index", **pdf info} for each prefetched order PDF as it lands
+#   "result" / "unchanged" / "error"  the final fetch_results return value
+
+TERMINAL_EVENTS = ("result", "unchanged", "error")
+
+async def _with_progress(task: asyncio.Task, queue: asyncio.Queue):
+    """Yields queued progress events until `task` finishes, then re-raises its error."""
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            yield getter.result()
+
+        while not queue.empty():
+            yield queue.get_nowait()
+        task.result()
+    finally:
+        # Client went away mid-stream: don't leave upstream work running
+        if not task.done():
+            task.cancel()
+
+async def stream_results(
+    session_id: str,
+    force_refresh: bool = False,
+    known_fingerprint: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
     print(f"[bold magenta]DEBUG[/bold magenta]: fetch_results for {session_id}")
-    session = await ScraperSession.get(session_id)
+    if force_refresh:
+        session, cached = await ScraperSession.get(session_id), None
+    else:
+        session, cached = await ScraperSession.get_with_result(session_id)
+
+    async with session.unit_of_work():
+        async for event in _build_results(session, cached, force_refresh, known_fingerprint):
+            yield event
+
+async def _build_results(
+    session: ScraperSession,
+    cached: Optional[Dict[str, Any]],
+    force_refresh: bool,
+    known_fingerprint: Optional[str]
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    session_id = session.session_id
+
+    # Serve the already computed result unless a re-scrape is requested
+    if session.state == STATE_HISTORY_FETCHED and not force_refresh:
+        if cached is not None:
+            print(f"[bold magenta]DEBUG[/bold magenta]: fetch_results served from cache for {session_id}")
+            yield "result", cached
+            return
     
     if session.state == STATE_SEARCH_SUBMITTED or session.state == STATE_HISTORY_FETCHED:
         # Process the stored HTML
+        await session.load_payload("result_html")
         raw_html_content = session.data["payload"].get("result_html")
+
+        # 0. Nothing changed upstream: skip business fetches, PDFs and parsing
+        fingerprint = compute_fingerprint(raw_html_content)
+        if known_fingerprint and fingerprint == known_fingerprint:
+            print(f"[bold magenta]DEBUG[/bold magenta]: fetch_results unchanged for {session_id}")
+            yield "unchanged", {"state": session.state, "unchanged": True, "fingerprint": fingerprint}
+            return
         
-        # 1. Parse Basic Structure
-        # We use the existing sanitization for the visual view
-        clean_html = sanitize_html(raw_html_content)
-        css_links = extract_css_links(raw_html_content)
-        
-        # 2. Parse Deep Data
-        parsed_data = parse_full_case_data(raw_html_content)
+        # 1-2. Parse once: metadata, history, orders, CSS links and the
+        # sanitised view all come from the same tree
+        extracted = extract_case(raw_html_content)
+        parsed_data = extracted["parsed"]
+        clean_html = extracted["clean_html"]
+        css_links = extracted["css_links"]
+
+        # Name order PDFs up front so the metadata event can link them
+        order_links = session.data.get("order_links", {})
+        for idx, row in enumerate(parsed_data.get("orders") or []):
+            if has_pdf_link(row.get("pdf_link_args")):
+                filename_local = f"order_{idx+1}.pdf"
+                row["pdf_filename"] = filename_local
+                order_links[filename_local] = row["pdf_link_args"]
+
+        yield "metadata", {
+            "fingerprint": fingerprint,
+            "case": parsed_data,
+            "history_html": clean_html,
+            "css_links": css_links,
+        }
         
         # 3. Fetch Business Status for each history row
         client = ECourtsClient(cookies=session.cookies, current_token=session.app_token)
+        # Cleared when any business row or prefetched PDF fails
+        complete = True
         
         if parsed_data.get("history_rows"):
             print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: [bold bright_magenta]DEBUG[/bold bright_magenta]: Fetching history business details for {len(parsed_data['history_rows'])} rows...")
-            for row in parsed_data["history_rows"]:
-                b_args = row.get("business_link_args")
-                if b_args and len(b_args) >= 9:
-                    try:
-                        # Construct payload as per reference
-                        b_payload = {
-                            'court_code': b_args[0], 
-                            'state_code': b_args[4] if len(b_args) > 4 else '', 
-                            'dist_code': 'undefined',
-                            'case_number1': b_args[3] if len(b_args) > 3 else '', 
-                            'disposal_flag': b_args[5] if len(b_args) > 5 else '', 
-                            'businessDate': b_args[6] if len(b_args) > 6 else '',
-                            'national_court_code': b_args[8] if len(b_args) > 8 else '', 
-                            'court_no': b_args[7] if len(b_args) > 7 else '', 
-                            'search_by': 'cnr', 
-                            'srno': b_args[10] if len(b_args) > 10 else '0', 
-                            'nextdate1': b_args[2] if len(b_args) > 2 else ''
-                        }
-                        # Run sync request in threadpool
-                        # biz_text = await run_in_threadpool(client.view_business, b_payload)
-                        biz_text = await retry_request(
-                            client.view_business,
-                            b_payload,
-                            attempts=3
-                        )
-
-                        # 🔥 CRITICAL FIX
-                        session.app_token = client.current_token
-                        session.cookies = client.get_cookies()
-                        await session.save()
+            progress = asyncio.Queue()
+            positions = {id(row): i for i, row in enumerate(parsed_data["history_rows"])}
 
-                        row["business_update"] = biz_text
-                    except Exception as e:
-                        print(f"[bold yellow]WARN[/bold yellow]: Failed to fetch business for row: {e}")
-                        row["business_update"] = "Failed to fetch"
-                else:
-                    row["business_update"] = "N/A"
+            async def on_row(row):
+                progress.put_nowait(("business", {"row": positions[id(row)], "business_update": row["business_update"]}))
+
+            task = asyncio.create_task(fetch_business_updates(session, client, parsed_data["history_rows"], on_row=on_row))
+            async for event in _with_progress(task, progress):
+                yield event
+
+            complete = all(row.get("business_update") != BUSINESS_FETCH_FAILED for row in parsed_data["history_rows"])
         
-        # 4. Process PDF Links (Download Orders)
+        # 4. Record PDF links (orders are fetched lazily on first view)
         if parsed_data.get("orders"):
             files = session.data.get("files", {})
-            print(f"[bold blue]PDF[/bold blue]: [bold blue]DEBUG[/bold blue]: Processing {len(parsed_data['orders'])} orders for PDF...")
-            
-            for idx, row in enumerate(parsed_data["orders"]):
-                p_args = row.get("pdf_link_args")
-                if p_args and len(p_args) >= 4:
-                    try:
-                        # Construct payload
-                        # displayPdf('normal_v', 'case_val', 'court_code', 'filename', 'appFlag')
-                        p_payload = {
-                            'normal_v': p_args[0], 'case_val': p_args[1], 
-                            'court_code': p_args[2], 'filename': p_args[3],
-                            'appFlag': p_args[4] if len(p_args) > 4 else ''
-                        }
-                         
-                        filename_local = f"order_{idx+1}.pdf"
-
-                        # 1️⃣ Trigger PDF generation with retry
-                        await retry_request(
-                            client.display_pdf,
-                            p_payload,
-                            attempts=3
-                        )
-
-                        # Persist updated token
-                        session.app_token = client.current_token
-                        session.cookies = client.get_cookies()
-                        await session.save()
-
-                        await asyncio.sleep(1)
-
-                        # 2️⃣ Download PDF with retry
-                        pdf_bytes = await retry_request(
-                            client.get_pdf_bytes,
-                            attempts=3
-                        )
-
-                        if pdf_bytes:
-                            storage = get_storage()
-                            storage_path = f"{session_id}/{filename_local}"
-                            saved_path = await storage.save(storage_path, pdf_bytes)
-
-                            files[filename_local] = saved_path
-                            row["pdf_filename"] = filename_local
-                            row["file_path"] = saved_path
-                            row["file_size"] = len(pdf_bytes)
-
-                            print(f"[bold blue]PDF[/bold blue]: [bold green]SUCCESS[/bold green]: Downloaded {filename_local}")
-                        else:
-                            print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Failed to download PDF bytes for order {idx+1}")
-                             
-                    except Exception as e:
-                        print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Failed to process PDF for order {idx+1}: {e}")
-            
-            # Update session with files
+            print(f"[bold blue]PDF[/bold blue]: [bold blue]DEBUG[/bold blue]: Recording {len(parsed_data['orders'])} order links...")
+
+            # Optional prefetch of the most recent orders, in parallel
+            prefetch = select_prefetch_orders(parsed_data["orders"], settings.ORDER_PDF_PREFETCH_RECENT)
+            if prefetch:
+                progress = asyncio.Queue()
+
+                async def on_pdf(i, info):
+                    if info:
+                        progress.put_nowait(("order", {"index": prefetch[i], **info}))
+
+                task = asyncio.create_task(fetch_order_pdfs(
+                    [parsed_data["orders"][idx]["pdf_link_args"] for idx in prefetch],
+                    on_done=on_pdf
+                ))
+                async for event in _with_progress(task, progress):
+                    yield event
+
+                for idx, info in zip(prefetch, task.result()):
+                    if info:
+                        row = parsed_data["orders"][idx]
+                        files[row["pdf_filename"]] = info["file_path"]
+                        row.update(info)
+                    else:
+                        complete = False
+
+            # Update session with files + links
             session.data["files"] = files
+            session.data["order_links"] = order_links
+            session.mark_dirty("files", "order_links")
             await session.save()
 
         # 5. Transform to Pydantic Schema
@@ -346,8 +469,13 @@ async def fetch_results(session_id: str) -> Dict[str, Any]:
         structured_model = transform_to_schema(parsed_data, cino)
         structured_schema_dict = structured_model.model_dump(mode='json')
 
+        if not complete:
+            print(f"[bold magenta]DEBUG[/bold magenta]: fetch_results incomplete for {session_id}, fingerprint will not be stored")
+
         result = {
             "state": session.state,
+            "fingerprint": fingerprint,
+            "complete": complete,
             "data": {
                 "structured_data": structured_schema_dict,
                 "history_html": clean_html,
@@ -355,98 +483,162 @@ async def fetch_results(session_id: str) -> Dict[str, Any]:
             }
         }
 
-        # Update session state
-        if session.state != STATE_HISTORY_FETCHED:
-            session.state = STATE_HISTORY_FETCHED
-            await session.save()
-        
+        # Update session state and cache the result together
+        session.state = STATE_HISTORY_FETCHED
         result["state"] = session.state
-        return result
+        await session.save(result=result)
+        yield "result", result
     
     else:
-        return {"state": session.state, "error": session.data.get("last_error")}
+        yield "error", {"state": session.state, "error": session.data.get("last_error")}
+
+async def fetch_results(
+    session_id: str,
+    force_refresh: bool = False,
+    known_fingerprint: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Builds the structured result for a submitted search.
+    With `known_fingerprint`, an unchanged case page returns early as
+    {"state", "unchanged": True, "fingerprint"} without any further upstream calls.
+    A full result has "complete": False when a business row or prefetched PDF
+    failed; store source_fingerprint(result) rather than its fingerprint.
+    """
+    result = None
+    async for event, data in stream_results(session_id, force_refresh, known_fingerprint):
+        if event in TERMINAL_EVENTS:
+            result = data
+    return result
+
+def source_fingerprint(result: Dict[str, Any]) -> Optional[str]:
+    """
+    The fingerprint to keep on the case. None for a partial scrape, so the
+    next refresh scrapes in full (and retries the failed rows) instead of
+    short-circuiting as unchanged.
+    """
+    return result.get("fingerprint") if result.get("complete") else None
+
+# ---- Party / Advocate case list ----
+# The result table is parsed once, when the search completes, and kept in the
+# session as {row index: row} with the viewHistory args already split out, so
+# listing and selecting never re-parse list_html. Paging and filtering run
+# on an in-memory index over it (case_list.py).
+
+# Allow extraction if we are in LIST_LOADED or if we already submitted a search (re-selection)
+CASE_LIST_STATES = (STATE_CASE_LIST_LOADED, STATE_SEARCH_SUBMITTED, STATE_HISTORY_FETCHED)
+
+def index_case_list(list_html) -> Dict[str, Dict[str, Any]]:
+    return {
+        str(c["index"]): {
+            "display": c["display"],
+            "case_number": c["case_number"],
+            "petitioner": c["petitioner"],
+            "respondent": c["respondent"],
+            "court": c["court"],
+            "onclick": c["onclick"],
+            "args": parse_onclick_args(c["onclick"]),
+        }
+        for c in parse_case_list(list_html)
+    }
 
-async def get_case_list(session_id: str):
-    """"For Party/Advocate search, returns the list of cases to select from."""
+async def load_case_list(session: ScraperSession) -> Dict[str, Dict[str, Any]]:
+    await session.load_payload("case_list")
+    case_list = session.data["payload"].get("case_list")
+    if case_list is None:
+        # Sessions created before the list was indexed at search time
+        await session.load_payload("list_html")
+        list_html = session.data["payload"].get("list_html")
+        if not list_html:
+            return {}
+        case_list = index_case_list(list_html)
+        session.update_payload({"case_list": case_list, "case_list_id": uuid.uuid4().hex})
+        await session.save()
+    return case_list
+
+async def get_case_list(
+    session_id: str,
+    window: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    **filters
+):
+    """
+    For Party/Advocate search, returns one page of the cases to select from.
+    Only the first `window` table rows are visible; `filters` are passed to
+    CaseListIndex.query (case_type, year, court, party, petitioner,
+    respondent, sort, descending).
+    """
     session = await ScraperSession.get(session_id)
     
-    # Allow extraction if we are in LIST_LOADED or if we already submitted a search (re-selection)
-    if session.state not in [STATE_CASE_LIST_LOADED, STATE_SEARCH_SUBMITTED, STATE_HISTORY_FETCHED]:
-        return {"state": session.state, "cases": []}
-    
-    list_html = session.data["payload"].get("list_html")
-    if not list_html:
-        return {"state": session.state, "cases": []}
-        
-    soup = BeautifulSoup(list_html, 'html.parser')
-    cases = []
+    if session.state not in CASE_LIST_STATES:
+        return {"state": session.state, "cases": [], "total": 0, "next_cursor": None}
     
-    # Parse table rows 
-    # eCourts returns a table with rows having onclick
-    for idx, row in enumerate(soup.find_all('tr')):
-        cols = row.find_all('td')
-        if len(cols) < 3: continue
-        
-        # Extract text for display
-        sr_no = clean_text(cols[0].text) # Usually first col is CNR or SR No
-        case_number = clean_text(cols[1].text)
-        raw_parties = clean_text(cols[2].text)
-
-        parties = split_parties(raw_parties)
-        pet_txt = parties["petitioner"]
-        res_txt = parties["respondent"]
-        
-        full_text = f"{sr_no} | {case_number} | {pet_txt} vs {res_txt}"
-        
-        link = row.find('a', onclick=re.compile(r'viewHistory'))
-        if link:
-            cases.append({
-                "index": idx,
-                "display": full_text,
-                "case_number": case_number,
-                "petitioner": pet_txt,
-                "respondent": res_txt,
-                "onclick": link['onclick']
-            })
-    print(f"[bold blue]CASE LIST[/bold blue]: [bold blue]DEBUG[/bold blue]: Found {len(cases)} cases")
-    return {"state": session.state, "cases": cases}
+    # The list blob is only fetched when this process has no index for it yet
+    version = session.data["payload"].get("case_list_id")
+    index = case_list_index.cached_index(session_id, version)
+    if index is None:
+        case_list = await load_case_list(session)
+        version = session.data["payload"].get("case_list_id")
+        index = case_list_index.get_index(session_id, version, case_list)
+
+    page = case_list_index.paginate(
+        index,
+        version,
+        window=window or len(index.rows),
+        limit=limit or settings.CASE_LIST_PAGE_SIZE,
+        cursor=cursor,
+        **filters
+    )
+    print(f"[bold blue]CASE LIST[/bold blue]: [bold blue]DEBUG[/bold blue]: {page['total']} of {len(index.rows)} cases match, returning {len(page['cases'])}")
+    return {"state": session.state, **page}
 
 async def select_case(session_id: str, case_index: int):
     """Triggers viewHistory for the selected case."""
-    session = await ScraperSession.get(session_id)
+    async with ScraperSession.open(session_id) as session:
+        return await _select_case(session, case_index)
+
+async def _select_case(session: ScraperSession, case_index: int):
+    # 1. Look up the row's viewHistory args in the indexed list
+    case_list = await load_case_list(session) if session.state in CASE_LIST_STATES else {}
+    args = _selected_args(case_list, case_index)
+    
+    # 2. Call viewHistory
+    client = ECourtsClient(cookies=session.cookies, current_token=session.app_token)
+    
+    print(f"[bold blue]CASE LIST[/bold blue]: [bold blue]DEBUG[/bold blue]: select_case fetching case details for CNR {args[1]}...")
+    try:
+        html_content = await _view_history(client, args)
+    finally:
+        # 🔥 Persist updated token + cookies
+        session.app_token = client.current_token
+        session.cookies = client.get_cookies()
+        await session.save()
     
-    # 1. Get List logic re-run to find the onclick args (inefficient but stateless)
-    data = await get_case_list(session_id)
-    cases = data['cases']
+    # Update session to SEARCH_SUBMITTED with this HTML
+    session.update_payload({"result_html": html_content, "cnr": args[1]}) # Update CNR to selected one
+    session.state = STATE_SEARCH_SUBMITTED
+    await session.save(clear_result=True)
     
-    selected_case = next((c for c in cases if c['index'] == case_index), None)
+    return {"status": "success", "cnr": args[1], "metadata": _case_metadata(html_content, args[1], case_index)}
+
+def _selected_args(case_list: Dict[str, Dict[str, Any]], case_index: int) -> List[str]:
+    selected_case = case_list.get(str(case_index))
     if not selected_case:
         raise Exception("Invalid Case Index")
         
-    onclick = selected_case['onclick']
-    # Extract args: viewHistory(case_no, cino, court_code, hideparty, search_flag, state_code, dist_code, court_complex_code, search_by)
-    match = re.search(r"viewHistory\((.*?)\)", onclick)
-    if not match:
+    # Args: viewHistory(case_no, cino, court_code, hideparty, search_flag, state_code, dist_code, court_complex_code, search_by)
+    args = selected_case["args"]
+    if len(args) < 9:
         raise Exception("Failed to parse viewHistory args")
-        
-    args = [arg.strip().strip("'").strip('"') for arg in match.group(1).split(',')]
-    
-    # 2. Call viewHistory
-    client = ECourtsClient(cookies=session.cookies, current_token=session.app_token)
-    
+    return args
+
+async def _view_history(client: ECourtsClient, args: List[str]) -> str:
     payload = {
         'case_no': args[0], 'cino': args[1], 'court_code': args[2], 'hideparty': args[3],
         'search_flag': args[4], 'state_code': args[5], 'dist_code': args[6],
         'court_complex_code': args[7], 'search_by': args[8]
     }
-    
-    print(f"[bold blue]CASE LIST[/bold blue]: [bold blue]DEBUG[/bold blue]: select_case fetching case details for CNR {args[1]}...")
-    resp = await run_in_threadpool(client.view_history, payload)
-
-    # 🔥 Persist updated token + cookies
-    session.app_token = client.current_token
-    session.cookies = client.get_cookies()
-    await session.save()
+    resp = await client.view_history(payload)
     
     try:
         data = resp.json()
@@ -454,64 +646,148 @@ async def select_case(session_id: str, case_index: int):
         raise Exception("Invalid JSON from viewHistory")
     
     html_content = data.get('data_list') or data.get('cino_data')
+    if not html_content:
+        raise Exception("No HTML content in viewHistory response")
+    return html_content
+
+def _case_metadata(html_content: str, cnr: str, case_index: int) -> Dict[str, Any]:
+    # Parse metadata for verification (Metadata Only)
+    from app.services.scraper.processor import parse_case_metadata
+    parsed = parse_case_metadata(html_content)
+    details = parsed.get("case_details", {})
+    status = parsed.get("status", {})
     
-    if html_content:
-        # Update session to SEARCH_SUBMITTED with this HTML
-        session.update_payload({"result_html": html_content, "cnr": args[1]}) # Update CNR to selected one
-        session.state = STATE_SEARCH_SUBMITTED
-        await session.save()
-        
-        # Parse metadata for verification (Metadata Only)
-        from app.services.scraper.processor import parse_case_metadata
-        parsed = parse_case_metadata(html_content)
-        details = parsed.get("case_details", {})
-        status = parsed.get("status", {})
-        
-        # Parse Status & Disposal
-        status_text = status.get("Case Status", "")
-        nature_of_disposal = ""
-        current_status = "Active" 
+    # Parse Status & Disposal
+    status_text = status.get("Case Status", "")
+    nature_of_disposal = ""
+    current_status = "Active" 
+    
+    if "disposed" in status_text.lower():
+        current_status = "Disposed"
+        if "-" in status_text:
+            # e.g. "Case disposed - Contested--ORDER"
+            parts = status_text.split("-", 1)
+            if len(parts) > 1:
+                nature_of_disposal = parts[1].strip()
+
+    return {
+        "case_type": details.get("Case Type"),
+        "filing_number": details.get("Filing Number"),
+        "filing_date": details.get("Filing Date"),
+        "registration_number": details.get("Registration Number"),
+        "registration_date": details.get("Registration Date"),
+        "cnr": details.get("CNR Number") or cnr,
         
-        if "disposed" in status_text.lower():
-            current_status = "Disposed"
-            if "-" in status_text:
-                # e.g. "Case disposed - Contested--ORDER"
-                parts = status_text.split("-", 1)
-                if len(parts) > 1:
-                    nature_of_disposal = parts[1].strip()
-
-        metadata = {
-            "case_type": details.get("Case Type"),
-            "filing_number": details.get("Filing Number"),
-            "filing_date": details.get("Filing Date"),
-            "registration_number": details.get("Registration Number"),
-            "registration_date": details.get("Registration Date"),
-            "cnr": details.get("CNR Number") or args[1],
-            
-            "first_hearing_date": status.get("First Hearing Date"),
-            "next_hearing_date": status.get("Next Hearing Date"),
-            "last_hearing_date": status.get("Last Hearing Date"),
-            "decision_date": status.get("Decision Date"),
-            "case_stage": status.get("Case Stage"),
-            "court_number_and_judge": status.get("Court Number and Judge"),
-            "case_status_text": status_text,
-            "nature_of_disposal": nature_of_disposal,
-            "current_status": current_status,
-            
-            "petitioner": parsed.get("petitioner"),
-            "respondent": parsed.get("respondent"),
-            "court_heading": parsed.get("court_heading"),
-            "case_index": case_index
-        }
+        "first_hearing_date": status.get("First Hearing Date"),
+        "next_hearing_date": status.get("Next Hearing Date"),
+        "last_hearing_date": status.get("Last Hearing Date"),
+        "decision_date": status.get("Decision Date"),
+        "case_stage": status.get("Case Stage"),
+        "court_number_and_judge": status.get("Court Number and Judge"),
+        "case_status_text": status_text,
+        "nature_of_disposal": nature_of_disposal,
+        "current_status": current_status,
         
-        return {"status": "success", "cnr": args[1], "metadata": metadata}
-    else:
-        raise Exception("No HTML content in viewHistory response")
+        "petitioner": parsed.get("petitioner"),
+        "respondent": parsed.get("respondent"),
+        "court_heading": parsed.get("court_heading"),
+        "case_index": case_index
+    }
+
+
+# ---- Multi-select ----
+# The scrape session's token chain only allows one request at a time, so
+# cloning its cookies into parallel requests would race on the server-side
+# token. Extra cases are instead fetched over spare warm-pool sessions (as
+# business rows are, and only for more than MULTI_SELECT_SHARD_MIN_CASES
+# cases), all pulling from one queue. A case whose extra session fails is
+# retried on the scrape session afterwards, so with no extra sessions this
+# degrades to the old sequential loop.
 
-async def refresh_case(cnr: str, max_retries: int = 5) -> Dict[str, Any]:
+async def select_cases(session_id: str, case_indices: List[int]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Selects several cases, yielding each one's select_case result in
+    `case_indices` order as soon as it (and every case before it) is done.
+    A case that could not be fetched yields {"status": "error", ...}.
+    Fetched pages are kept in payload["selected_html"] keyed by CNR; the
+    session ends up as if the cases had been selected one by one.
+    """
+    async with ScraperSession.open(session_id) as session:
+        case_list = await load_case_list(session) if session.state in CASE_LIST_STATES else {}
+        jobs = [(index, _selected_args(case_list, index)) for index in case_indices]
+        if not jobs:
+            return
+
+        loop = asyncio.get_running_loop()
+        results = [loop.create_future() for _ in jobs]
+        pending = deque(range(len(jobs)))
+        retry: List[int] = []
+        pages: Dict[str, str] = {}
+
+        primary = ECourtsClient(cookies=session.cookies, current_token=session.app_token)
+
+        async def worker(client: ECourtsClient, is_primary: bool):
+            while pending:
+                pos = pending.popleft()
+                case_index, args = jobs[pos]
+                try:
+                    html_content = await _view_history(client, args)
+                except Exception as e:
+                    if not is_primary:
+                        print(f"[bold blue]CASE LIST[/bold blue]: [bold yellow]WARN[/bold yellow]: Extra session failed on case {case_index} ({e}), retrying on the scrape session")
+                        retry.append(pos)
+                        return
+                    results[pos].set_result({"status": "error", "case_index": case_index, "cnr": args[1], "error": str(e)})
+                else:
+                    pages[args[1]] = html_content
+                    results[pos].set_result({"status": "success", "cnr": args[1], "metadata": _case_metadata(html_content, args[1], case_index)})
+                finally:
+                    if is_primary:
+                        session.app_token = client.current_token
+                        session.cookies = client.get_cookies()
+                        await session.save()
+
+        async def run():
+            extra_clients = []
+            if len(jobs) > settings.MULTI_SELECT_SHARD_MIN_CASES:
+                extra_clients = await warm_pool.open_spare_clients(min(settings.MULTI_SELECT_SESSIONS, len(jobs)) - 1)
+            print(f"[bold blue]CASE LIST[/bold blue]: [bold blue]DEBUG[/bold blue]: Selecting {len(jobs)} cases over {len(extra_clients) + 1} sessions")
+            try:
+                await asyncio.gather(worker(primary, is_primary=True), *(worker(c, is_primary=False) for c in extra_clients))
+                pending.extend(retry)
+                await worker(primary, is_primary=True)
+            finally:
+                for pos, future in enumerate(results):
+                    if not future.done():
+                        future.set_result({"status": "error", "case_index": jobs[pos][0], "cnr": jobs[pos][1][1], "error": "Selection aborted"})
+
+            selected = [jobs[pos][1][1] for pos in range(len(jobs)) if jobs[pos][1][1] in pages]
+            if selected:
+                await session.load_payload("selected_html")
+                last = selected[-1]
+                session.update_payload({
+                    "selected_html": {**(session.data["payload"].get("selected_html") or {}), **pages},
+                    "result_html": pages[last],
+                    "cnr": last
+                })
+                session.state = STATE_SEARCH_SUBMITTED
+                await session.save(clear_result=True)
+
+        engine = asyncio.create_task(run())
+        try:
+            for future in results:
+                yield await future
+            await engine
+        finally:
+            # Caller went away mid-way: stop fetching
+            if not engine.done():
+                engine.cancel()
+
+async def refresh_case(cnr: str, max_retries: int = 5, known_fingerprint: Optional[str] = None) -> Dict[str, Any]:
     """
     Automated flow to refresh a case by CNR.
     Retries entire flow including OCR failures.
+    Returns early with "unchanged" if the case page matches `known_fingerprint`.
     """
     print(f"[bold blue]REFRESH[/bold blue]: [bold blue]DEBUG[/bold blue]: Starting automated refresh for {cnr}")
     
@@ -524,7 +800,7 @@ async def refresh_case(cnr: str, max_retries: int = 5) -> Dict[str, Any]:
             img_bytes = await get_captcha(session_id)
             
             # 3. Solve Captcha (OCR)
-            captcha_code = await run_in_threadpool(solve_captcha, img_bytes)
+            captcha_code = await ocr.solve(img_bytes)
             
             if not captcha_code or len(captcha_code) < 3:
                 print(f"[bold blue]REFRESH[/bold blue]: [bold yellow]WARN[/bold yellow]: OCR failed or weak (attempt {attempt+1})")
@@ -543,7 +819,7 @@ async def refresh_case(cnr: str, max_retries: int = 5) -> Dict[str, Any]:
             session = await ScraperSession.get(session_id)
             if session.state == STATE_SEARCH_SUBMITTED:
                 # Success! Fetch full results
-                result = await fetch_results(session_id)
+                result = await fetch_results(session_id, known_fingerprint=known_fingerprint)
                 return result
             else:
                 print(f"[bold blue]REFRESH[/bold blue]: [bold yellow]WARN[/bold yellow]: Flow failed state={session.state} (attempt {attempt+1})")
@@ -553,3 +829,76 @@ async def refresh_case(cnr: str, max_retries: int = 5) -> Dict[str, Any]:
             
     raise Exception(f"[bold blue]REFRESH[/bold blue]: [bold red]ERROR[/bold red]: Failed to refresh case {cnr} after {max_retries} attempts")
 
+async def fetch_results_from_html(cnr: str, result_html: str) -> Dict[str, Any]:
+    """
+    fetch_results for a case page fetched earlier (e.g. by select_cases),
+    skipping the search and its captcha. A warm-pool session supplies the
+    token for the business and PDF calls.
+    """
+    client = await warm_pool.open_client()
+    if client is None:
+        raise TokenError("Could not open an eCourts session")
+
+    session = await ScraperSession.create("cnr", {"cnr": cnr})
+    session.app_token = client.current_token
+    session.cookies = client.get_cookies()
+    session.update_payload({"result_html": result_html})
+    session.state = STATE_SEARCH_SUBMITTED
+    await session.save()
+
+    print(f"[bold blue]REFRESH[/bold blue]: [bold blue]DEBUG[/bold blue]: Building {cnr} from an already fetched case page")
+    return await fetch_results(session.session_id)
+
+# A session order PDF is downloaded by whichever request claims it first
+# (SET NX); concurrent requests for the same order wait for that download.
+SESSION_PDF_CLAIM_TTL = 60  # seconds; outlives one display_pdf + download
+SESSION_PDF_WAIT_INTERVAL = 0.5
+
+async def get_session_order_pdf(session_id: str, filename: str) -> Optional[str]:
+    """
+    Returns the storage path of a scraped order PDF, fetching it from
+    eCourts on first request.
+    """
+    session = await ScraperSession.get(session_id)
+
+    files = session.data.get("files", {})
+    if filename in files and await get_storage().exists(files[filename]):
+        return files[filename]
+
+    p_args = session.data.get("order_links", {}).get(filename)
+    if not has_pdf_link(p_args):
+        return None
+
+    redis = await get_redis()
+    claim_key = session.blob_key(f"pdf_claim:{filename}")
+    claim = uuid.uuid4().hex
+    if not await redis.set(claim_key, claim, nx=True, ex=SESSION_PDF_CLAIM_TTL):
+        return await _wait_for_session_pdf(session_id, filename, claim_key)
+
+    try:
+        info = await fetch_order_pdf(p_args)
+        if not info:
+            return None
+
+        # Re-read just before writing, so files other orders stored meanwhile are kept
+        session = await ScraperSession.get(session_id)
+        session.data.setdefault("files", {})[filename] = info["file_path"]
+        session.mark_dirty("files")
+        await session.save()
+        return info["file_path"]
+    finally:
+        await redis.eval(warm_pool.RELEASE_LOCK_SCRIPT, 1, claim_key, claim)
+
+async def _wait_for_session_pdf(session_id: str, filename: str, claim_key: str) -> Optional[str]:
+    redis = await get_redis()
+    deadline = time.monotonic() + SESSION_PDF_CLAIM_TTL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SESSION_PDF_WAIT_INTERVAL)
+        session = await ScraperSession.get(session_id)
+        path = session.data.get("files", {}).get(filename)
+        if path:
+            return path
+        if not await redis.exists(claim_key):
+            # The claiming request finished without storing it
+            return None
+    return None
@@ -1,25 +1,154 @@
+import io
+import time
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Any
 import pytesseract
 from PIL import Image
-import io
+from app.core.config import settings
+from app.services.scraper import captcha, captcha_model
+from rich import print
+
+# Captcha OCR runs in a pool of long-lived worker processes, off the threads
+# that serve HTTP. Each worker loads Tesseract once: through tesserocr
+# (in-process libtesseract) when it is installed, otherwise through pytesseract,
+# which still spawns the tesseract binary per call but only inside the worker.
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+# Per-process worker state, set up by _init_worker
+_api = None
+_config = ""
+
+# Parent-side latency metrics
+_latencies_ms: deque = deque(maxlen=1000)
+_stats = {"solved": 0, "empty": 0, "failed": 0}
+
+
+def _tesseract_config(psm: int, whitelist: str) -> str:
+    return f"--psm {psm} -c tessedit_char_whitelist={whitelist}"
+
 
-def solve_captcha(image_bytes: bytes) -> str:
+def _init_worker(psm: int, whitelist: str):
+    global _api, _config
+    _config = _tesseract_config(psm, whitelist)
+    if tesserocr is not None:
+        _api = tesserocr.PyTessBaseAPI(psm=psm)
+        _api.SetVariable("tessedit_char_whitelist", whitelist)
+
+
+def solve_captcha(image_bytes: bytes, preprocess: Optional[bool] = None) -> str:
     """
     Solves a CAPTCHA image using Tesseract OCR.
-    Pre-processes the image for better accuracy.
+    The NumPy clean-up (captcha.preprocess) only runs with `preprocess` or
+    OCR_PREPROCESS, which is off by default; otherwise the image is just
+    converted to grayscale.
     """
+    if preprocess is None:
+        preprocess = settings.OCR_PREPROCESS
+
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Pre-processing (Convert to grayscale, maybe thresholding if needed)
-        # eCourts captchas are usually simple enough for default tesseract or just grayscale
-        gray_image = image.convert('L')
-        
+        # Pre-processing: threshold, strip noise lines, segment (see captcha.py)
+        if preprocess:
+            gray_image = captcha.preprocess(image_bytes, settings.OCR_DILATE_ITERATIONS)
+        else:
+            gray_image = Image.open(io.BytesIO(image_bytes)).convert('L')
+
         # OCR
-        text = pytesseract.image_to_string(gray_image)
-        
+        if _api is not None:
+            _api.SetImage(gray_image)
+            text = _api.GetUTF8Text()
+        else:
+            text = pytesseract.image_to_string(
+                gray_image,
+                config=_config or _tesseract_config(settings.OCR_PSM, settings.OCR_WHITELIST)
+            )
+
         # Clean result (alphanumeric only usually)
         clean_text = "".join(c for c in text if c.isalnum())
         return clean_text
     except Exception as e:
         print(f"[bold bright_cyan]OCR[/bold bright_cyan]: [bold red]ERROR[/bold red]: OCR Failed: {e}")
         return ""
+
+
+def recognize(image_bytes: bytes) -> str:
+    """Runs the configured solver (CAPTCHA_SOLVER)."""
+    if settings.CAPTCHA_SOLVER in ("template", "auto"):
+        text = captcha_model.predict(image_bytes)
+        if text or settings.CAPTCHA_SOLVER == "template":
+            return text
+    return solve_captcha(image_bytes)
+
+
+def _mp_context():
+    # The pool starts lazily inside the running server, which by then has
+    # threads and open Redis / eCourts sockets: forking it can deadlock the
+    # workers or hand them those sockets, so workers start from a clean process
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.OCR_WORKERS,
+            mp_context=_mp_context(),
+            initializer=_init_worker,
+            initargs=(settings.OCR_PSM, settings.OCR_WHITELIST),
+        )
+    return _executor
+
+
+async def solve(image_bytes: bytes) -> str:
+    """Solves one captcha on the OCR worker pool."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        text = await loop.run_in_executor(_get_executor(), recognize, image_bytes)
+    except Exception as e:
+        _stats["failed"] += 1
+        print(f"[bold bright_cyan]OCR[/bold bright_cyan]: [bold red]ERROR[/bold red]: OCR worker failed: {e}")
+        return ""
+
+    _latencies_ms.append((time.perf_counter() - started) * 1000)
+    _stats["solved" if text else "empty"] += 1
+    return text
+
+
+async def solve_many(images: List[bytes]) -> List[str]:
+    """Solves several captchas in parallel; results are in input order."""
+    return list(await asyncio.gather(*(solve(img) for img in images)))
+
+
+def get_metrics() -> Dict[str, Any]:
+    samples = sorted(_latencies_ms)
+
+    def percentile(p: float) -> Optional[float]:
+        if not samples:
+            return None
+        return round(samples[min(int(len(samples) * p), len(samples) - 1)], 1)
+
+    return {
+        **_stats,
+        "workers": settings.OCR_WORKERS,
+        "solver": settings.CAPTCHA_SOLVER,
+        "engine": "tesserocr" if tesserocr is not None else "pytesseract",
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "max_ms": round(samples[-1], 1) if samples else None,
+    }
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,171 @@
+import time
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Awaitable
+from app.core.config import settings
+from app.services.scraper.client import ECourtsClient, retry_request
+from app.services.scraper import warm_pool
+from app.services.storage import blobs
+from rich import print
+
+
+def build_pdf_payload(p_args: List[str]) -> Dict[str, str]:
+    # displayPdf('normal_v', 'case_val', 'court_code', 'filename', 'appFlag')
+    return {
+        'normal_v': p_args[0], 'case_val': p_args[1],
+        'court_code': p_args[2], 'filename': p_args[3],
+        'appFlag': p_args[4] if len(p_args) > 4 else ''
+    }
+
+
+def has_pdf_link(p_args: Optional[List[str]]) -> bool:
+    return bool(p_args) and len(p_args) >= 4
+
+
+async def prepare_order_pdf(p_args: List[str], client: Optional[ECourtsClient] = None) -> Optional[ECourtsClient]:
+    """
+    Asks eCourts to generate one order PDF and waits until it is downloadable.
+    Without a client, a warm-pool (or freshly tokenised) session is used.
+    Returns the client the report belongs to.
+    """
+    if client is None:
+        client = await warm_pool.open_client()
+        if client is None:
+            return None
+
+    # 1️⃣ Trigger PDF generation with retry
+    await retry_request(
+        client.display_pdf,
+        build_pdf_payload(p_args),
+        attempts=3
+    )
+
+    # 2️⃣ Wait until the report is generated (adaptive backoff instead of a fixed sleep)
+    ready = await retry_request(
+        client.wait_for_pdf,
+        settings.PDF_READY_TIMEOUT,
+        settings.PDF_POLL_INITIAL_DELAY,
+        settings.PDF_POLL_MAX_DELAY,
+        attempts=3
+    )
+    if not ready:
+        print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: PDF not ready after {settings.PDF_READY_TIMEOUT}s")
+
+    return client
+
+
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+
+async def fetch_order_pdf(
+    p_args: List[str],
+    client: Optional[ECourtsClient] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Downloads an order PDF and streams it into the content-addressed store.
+    Returns file info (path, size, sha256, latency) or None.
+    """
+    label = p_args[3] if has_pdf_link(p_args) else "order"
+    started = time.perf_counter()
+    client = await prepare_order_pdf(p_args, client)
+    if client is None:
+        return None
+
+    # 3️⃣ Open the download with retry, then stream it into storage
+    resp = await retry_request(client.open_pdf_stream, attempts=3)
+    if resp is None:
+        print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Failed to download PDF bytes for {label}")
+        return None
+
+    try:
+        chunks = resp.aiter_bytes(settings.PDF_STREAM_CHUNK_SIZE)
+        first = await anext(chunks, b"")
+        if b'%PDF' not in first:
+            print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Response for {label} is not a PDF")
+            return None
+
+        stored = await blobs.store_stream(_prepend(first, chunks))
+    finally:
+        await resp.aclose()
+
+    latency_ms = int((time.perf_counter() - started) * 1000)
+    print(f"[bold blue]PDF[/bold blue]: [bold green]SUCCESS[/bold green]: Downloaded {label} in {latency_ms} ms")
+    return {
+        "file_path": stored["path"],
+        "file_size": stored["size"],
+        "sha256": stored["sha256"],
+        "latency_ms": latency_ms,
+    }
+
+
+# The report URL is keyed by the eCourts session id, so one session can only
+# generate one PDF at a time. Parallel downloads use a few sessions, each
+# working through the queue one order at a time.
+PDF_FETCH_SEMAPHORE = asyncio.Semaphore(settings.PDF_FETCH_GLOBAL_LIMIT)
+
+
+async def _open_pdf_clients(count: int) -> List[ECourtsClient]:
+    # Spare warm-pool sessions only; a single (possibly cold-started) one otherwise
+    clients = await warm_pool.open_spare_clients(count)
+    if clients:
+        return clients
+    try:
+        client = await warm_pool.open_client()
+    except Exception as e:
+        print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Could not open an eCourts session: {e}")
+        return []
+    return [client] if client is not None else []
+
+
+async def fetch_order_pdfs(
+    jobs: List[List[str]],
+    concurrency: Optional[int] = None,
+    on_done: Optional[Callable[[int, Optional[Dict[str, Any]]], Awaitable[None]]] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Downloads several order PDFs over at most `concurrency` eCourts sessions,
+    reused from one order to the next.
+    `jobs` is a list of pdf_link_args; results come back in the same order
+    (None for failures). `on_done(i, info)` is awaited as each job finishes.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    if not jobs:
+        return results
+
+    pending = deque(range(len(jobs)))
+    clients = await _open_pdf_clients(min(concurrency or settings.PDF_FETCH_CONCURRENCY, len(jobs)))
+
+    async def worker(client: ECourtsClient):
+        while pending:
+            i = pending.popleft()
+            async with PDF_FETCH_SEMAPHORE:
+                try:
+                    results[i] = await fetch_order_pdf(jobs[i], client)
+                except Exception as e:
+                    print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Failed to process PDF {jobs[i]}: {e}")
+            if on_done is not None:
+                await on_done(i, results[i])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(c) for c in clients))
+
+    latencies = [r["latency_ms"] for r in results if r]
+    print(
+        f"[bold blue]PDF[/bold blue]: Fetched {len(latencies)}/{len(jobs)} PDFs over {len(clients)} sessions in "
+        f"{int((time.perf_counter() - started) * 1000)} ms "
+        f"(per-order ms: {latencies})"
+    )
+    return results
+
+
+def select_prefetch_orders(orders: List[Dict[str, Any]], limit: int) -> List[int]:
+    """Indices of the `limit` most recent orders that have a PDF link."""
+    if limit <= 0:
+        return []
+    linked = [i for i, o in enumerate(orders) if has_pdf_link(o.get("pdf_link_args"))]
+    # Undated orders sort last; ISO date strings compare chronologically
+    linked.sort(key=lambda i: orders[i].get("order_date") or "", reverse=True)
+    return linked[:limit]
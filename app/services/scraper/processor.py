@@ -1,9 +1,10 @@
 # processor.py
 import re
 import html
+import hashlib
 import bleach
 from bleach.css_sanitizer import CSSSanitizer
-from bs4 import BeautifulSoup
+from app.services.scraper.utils import make_soup
 from datetime import datetime
 
 DATE_FORMATS = [
@@ -122,8 +123,8 @@ def parse_party_text(soup, css_class, header_text):
         table = soup.find('table', class_=css_class)
     
     if table:
-        for br in table.find_all("br"):
-            br.replace_with("\n")
+        # <br> contributes no text, so the separator already splits on it;
+        # the tree is left untouched for the other extractors
         return clean_text(table.get_text(separator=" ", strip=True))
 
     # NEW LOGIC: Look for target header and get all text until next heading
@@ -181,26 +182,85 @@ def parse_history_row_text(cells, business_text=""):
         'business_update': clean_text(cells[4]) if len(cells) > 4 else business_text
     }
 
-def sanitize_html(html_fragment):
+# Parts of the case page that change between requests without the case changing
+VOLATILE_HTML_PATTERNS = [
+    re.compile(r"<script\b.*?</script>", re.S | re.I),
+    re.compile(r"<input\b[^>]*type=[\"']?hidden[^>]*>", re.I),
+    re.compile(r"app_token=[\w-]+", re.I),
+]
+
+def compute_fingerprint(html_content):
     """
-    Accepts raw HTML fragment from eCourts
-    Returns sanitized HTML safe for frontend rendering
+    Hash of the case page with volatile bits and whitespace stripped.
+    Equal fingerprints mean the case has not changed upstream.
     """
-    if not html_fragment:
-        return ""
+    if not html_content:
+        return None
+
+    normalized = html.unescape(html_content)
+    for pattern in VOLATILE_HTML_PATTERNS:
+        normalized = pattern.sub("", normalized)
+    normalized = " ".join(normalized.split())
+
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+# Built once: constructing the bleach sanitizer per call is not free
+CSS_SANITIZER = CSSSanitizer(
+    allowed_css_properties=[
+        "text-align",
+        "font-weight",
+        "font-style",
+        "text-decoration",
+        "color",
+        "background-color",
+        "border",
+        "border-collapse",
+        "border-spacing",
+        "width",
+        "height",
+        "padding",
+        "margin",
+        "vertical-align",
+        "font-size"
+    ]
+)
+
+HTML_CLEANER = bleach.Cleaner(
+    tags=[
+        "div","span","table","thead","tbody","tr","td","th",
+        "p","b","strong","i","u","br","h2","h3","label","em","a",
+        "font", "center"
+    ],
+    attributes={
+        "*": [
+            "class","style","id",
+            "align","colspan","rowspan","width","border","scope",
+            "cellpadding", "cellspacing" 
+        ]
+    },
+    css_sanitizer=CSS_SANITIZER,
+    strip=True
+)
 
+def parse_fragment(html_fragment, container_id):
+    """
+    Decodes an eCourts HTML fragment and parses it once.
+    Returns (soup, container) where container wraps the fragment.
+    """
     # decode escaped HTML
     html_fragment = html.unescape(html_fragment)
 
     # wrap fragment (API returns inner HTML)
-    wrapped_html = f'<div id="sanitized_content">{html_fragment}</div>'
+    wrapped_html = f'<div id="{container_id}">{html_fragment}</div>'
 
-    soup = BeautifulSoup(wrapped_html, "html.parser")
-    container = soup.select_one("#sanitized_content")
-
-    if not container:
-        return ""
+    soup = make_soup(wrapped_html)
+    return soup, soup.select_one(f"#{container_id}")
 
+def sanitize_tree(container):
+    """
+    Sanitises a parsed fragment for frontend rendering.
+    Mutates the tree, so it must run after any extraction on it.
+    """
     # remove scripts & iframes entirely
     for tag in container.find_all(["script", "iframe"]):
         tag.decompose()
@@ -224,51 +284,28 @@ def sanitize_html(html_fragment):
             classes.insert(0, "table")
         table["class"] = classes
 
+    container["id"] = "sanitized_content"
     raw_html = str(container)
 
     # final bleach sanitize (preserve layout)
-    css_sanitizer = CSSSanitizer(
-        allowed_css_properties=[
-            "text-align",
-            "font-weight",
-            "font-style",
-            "text-decoration",
-            "color",
-            "background-color",
-            "border",
-            "border-collapse",
-            "border-spacing",
-            "width",
-            "height",
-            "padding",
-            "margin",
-            "vertical-align",
-            "font-size"
-        ]
-    )
-    clean_html = bleach.clean(
-        raw_html,
-        tags=[
-            "div","span","table","thead","tbody","tr","td","th",
-            "p","b","strong","i","u","br","h2","h3","label","em","a",
-            "font", "center"
-        ],
-        attributes={
-            "*": [
-                "class","style","id",
-                "align","colspan","rowspan","width","border","scope",
-                "cellpadding", "cellspacing" 
-            ]
-        },
-        css_sanitizer=css_sanitizer,
-        strip=True
-        
-    )
+    return HTML_CLEANER.clean(raw_html)
+
+def sanitize_html(html_fragment):
+    """
+    Accepts raw HTML fragment from eCourts
+    Returns sanitized HTML safe for frontend rendering
+    """
+    if not html_fragment:
+        return ""
 
-    return clean_html
+    _, container = parse_fragment(html_fragment, "sanitized_content")
 
-def extract_css_links(html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
+    if not container:
+        return ""
+
+    return sanitize_tree(container)
+
+def find_css_links(soup):
     links = []
     for link in soup.find_all("link", rel="stylesheet"):
         href = link.get("href")
@@ -276,6 +313,100 @@ def extract_css_links(html_content):
             links.append(href)
     return links
 
+def extract_css_links(html_content):
+    return find_css_links(make_soup(html_content))
+
+def parse_business_html(html_content):
+    """Business text for one hearing from a viewBusiness `data_list` fragment."""
+    if not html_content: return "N/A"
+
+    soup = make_soup(html_content)
+    # Logic to find the correct business date column
+    business_td = soup.find(lambda tag: tag.name == "td" and "Business" in tag.text and "Date" not in tag.text)
+
+    result_text = clean_text(soup.text)
+    if business_td:
+        row = business_td.find_parent('tr')
+        cells = row.find_all('td')
+        if len(cells) >= 3:
+            result_text = clean_text(cells[2].text)
+    return result_text
+
+VS_PATTERN = re.compile(r'(?i)(?:\s*)(?:v\/?s\.?|vs\.?|v\.)(?:\s*)')
+
+def split_parties(raw_parties: str):
+    parts = VS_PATTERN.split(raw_parties, maxsplit=1)
+
+    if len(parts) != 2:
+        return {
+            "petitioner": raw_parties.strip(),
+            "respondent": None,
+            "error": "Could not split parties"
+        }
+
+    petitioner = parts[0].strip()
+    respondent = parts[1].strip()
+
+    return {
+        "petitioner": petitioner,
+        "respondent": respondent
+    }
+
+def parse_case_list(list_html):
+    """
+    Rows of a Party/Advocate search result table that can be opened
+    (have a viewHistory link). `index` is the row's position in the table,
+    `court` the court heading the row is listed under.
+    """
+    if not list_html: return []
+
+    soup = make_soup(list_html)
+    cases = []
+
+    court = None
+
+    # Parse table rows
+    # eCourts returns a table with rows having onclick
+    for idx, row in enumerate(soup.find_all('tr')):
+        cols = row.find_all('td')
+
+        # Results are grouped under single-cell court name rows
+        if len(cols) == 1 and clean_text(cols[0].text):
+            court = clean_text(cols[0].text)
+            continue
+        if len(cols) < 3: continue
+
+        # Extract text for display
+        sr_no = clean_text(cols[0].text) # Usually first col is CNR or SR No
+        case_number = clean_text(cols[1].text)
+        raw_parties = clean_text(cols[2].text)
+
+        parties = split_parties(raw_parties)
+        pet_txt = parties["petitioner"]
+        res_txt = parties["respondent"]
+
+        full_text = f"{sr_no} | {case_number} | {pet_txt} vs {res_txt}"
+
+        link = row.find('a', onclick=re.compile(r'viewHistory'))
+        if link:
+            cases.append({
+                "index": idx,
+                "display": full_text,
+                "case_number": case_number,
+                "petitioner": pet_txt,
+                "respondent": res_txt,
+                "court": court,
+                "onclick": link['onclick']
+            })
+    return cases
+
+def split_case_number(case_number):
+    """'R.C.S./452/2019' -> ('R.C.S.', '452', 2019). Missing parts are None."""
+    parts = [p.strip() for p in (case_number or "").rsplit('/', 2)]
+    if len(parts) == 3 and parts[2].isdigit() and len(parts[2]) == 4:
+        return parts[0] or None, parts[1] or None, int(parts[2])
+    return (case_number or None), None, None
+
 def parse_onclick_args(onclick_text):
     """Extracts arguments from a JS function call like func('arg1', 'arg2')."""
     if not onclick_text: return []
@@ -287,19 +418,8 @@ def parse_onclick_args(onclick_text):
     args = [arg.strip().strip("'").strip('"') for arg in match.group(1).split(',')]
     return args
 
-def parse_case_metadata(html_content):
-    """
-    Parses only the metadata sections (Details, Status, Parties, Acts, FIR).
-    Skips History and Orders tables.
-    """
-    if not html_content: return {}
-    
-    # decode escaped HTML
-    html_fragment = html.unescape(html_content)
-    # wrap fragment
-    wrapped_html = f'<div id="case_data">{html_fragment}</div>'
-    soup = BeautifulSoup(wrapped_html, "html.parser")
-    
+def extract_metadata(soup):
+    """Metadata sections (Details, Status, Parties, Acts, FIR) from a parsed case page."""
     heading_el = soup.select_one('#chHeading')
     court_heading = clean_text(heading_el.text) if heading_el else None
 
@@ -313,25 +433,10 @@ def parse_case_metadata(html_content):
         "fir_details": parse_kv_table(soup, "FIR_details_table"),
     }
 
-def parse_full_case_data(html_content):
-    """
-    Parses the raw HTML into a structured dictionary matching the reference CLI output.
-    Returns full data including History and Orders.
-    """
-    if not html_content: return {}
-    
-    # Reuse metadata parsing
-    data = parse_case_metadata(html_content)
-    
-    # Need soup again for History/Orders (optimization: could return soup from metadata parser, but HTML parse is fast enough)
-    html_fragment = html.unescape(html_content)
-    wrapped_html = f'<div id="case_data">{html_fragment}</div>'
-    soup = BeautifulSoup(wrapped_html, "html.parser")
-    
-    data["history_rows"] = []
-    data["orders"] = []
-    
-    # Parse History Table for Business Logic
+def extract_history_rows(soup):
+    """History rows with their viewBusiness link args."""
+    history_rows = []
+
     hist_table = soup.find('table', class_='history_table')
     if hist_table:
         for row in hist_table.find_all('tr'):
@@ -350,9 +455,14 @@ def parse_full_case_data(html_content):
             if link and 'viewBusiness' in link.get('onclick', ''):
                 h_row['business_link_args'] = parse_onclick_args(link['onclick'])
                 
-            data["history_rows"].append(h_row)
+            history_rows.append(h_row)
+
+    return history_rows
+
+def extract_orders(soup):
+    """Order rows with their displayPdf link args."""
+    orders = []
 
-    # Parse Orders
     orders_table = soup.find('table', class_='order_table')
     if orders_table:
         for row in orders_table.find_all('tr'):
@@ -386,6 +496,52 @@ def parse_full_case_data(html_content):
                 o_row['pdf_link_args'] = best_args
                 o_row["order_details"] = link.text.strip()
             
-            data["orders"].append(o_row)
+            orders.append(o_row)
+
+    return orders
+
+def extract_case(html_content):
+    """
+    Single-pass extraction for a case page: parses the HTML once and returns
+    {"parsed": metadata + history_rows + orders, "clean_html", "css_links"}.
+    Sanitisation mutates the tree, so it runs last.
+    """
+    if not html_content:
+        return {"parsed": {}, "clean_html": "", "css_links": []}
+
+    soup, container = parse_fragment(html_content, "case_data")
+
+    parsed = extract_metadata(soup)
+    parsed["history_rows"] = extract_history_rows(soup)
+    parsed["orders"] = extract_orders(soup)
+    css_links = find_css_links(soup)
+
+    return {
+        "parsed": parsed,
+        "clean_html": sanitize_tree(container),
+        "css_links": css_links,
+    }
+
+def parse_case_metadata(html_content):
+    """
+    Parses only the metadata sections (Details, Status, Parties, Acts, FIR).
+    Skips History and Orders tables.
+    """
+    if not html_content: return {}
+
+    soup, _ = parse_fragment(html_content, "case_data")
+    return extract_metadata(soup)
+
+def parse_full_case_data(html_content):
+    """
+    Parses the raw HTML into a structured dictionary matching the reference CLI output.
+    Returns full data including History and Orders.
+    """
+    if not html_content: return {}
+
+    soup, _ = parse_fragment(html_content, "case_data")
 
+    data = extract_metadata(soup)
+    data["history_rows"] = extract_history_rows(soup)
+    data["orders"] = extract_orders(soup)
     return data
@@ -1,11 +1,27 @@
 import json
 import uuid
 import time
-from typing import Dict, Optional, Any
+import zlib
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Any, List, Tuple, Set
+from redis.exceptions import ResponseError
 from app.core.redis import get_redis
 from app.core.config import settings
 from app.services.scraper.errors import SessionExpiredError
 
+# orjson / zstandard are used when installed; the stored formats stay
+# readable either way (orjson writes plain JSON, and a blob's codec is
+# recognised from its frame header).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # Session States
 STATE_INIT = "INIT"
 STATE_CAPTCHA_REQUIRED = "CAPTCHA_REQUIRED"
@@ -16,11 +32,119 @@ STATE_HISTORY_FETCHED = "HISTORY_FETCHED"
 STATE_COMPLETED = "COMPLETED"
 STATE_FAILED = "FAILED"
 
+# Sessions are Redis hashes with one field per top-level key and one per
+# payload key ("payload.<key>"), so a save only writes the fields that
+# changed. Inside a unit of work saves are deferred and flushed once at the
+# end (or every SESSION_FLUSH_INTERVAL seconds), except for the eCourts
+# token chain: a lost token or cookie jar breaks the session, so those are
+# written through immediately.
+PAYLOAD_PREFIX = "payload."
+WRITE_THROUGH_FIELDS = {"app_token", "cookies"}
+
+# Page-sized payload values live outside the hash, each compressed under
+# "session:<id>:payload.<key>", and are only fetched by the flows that read
+# them (load_payload). The hash itself stays a few hundred bytes.
+BLOB_PAYLOAD_KEYS = ("result_html", "list_html", "case_list", "selected_html")
+BLOB_FIELDS = {PAYLOAD_PREFIX + k for k in BLOB_PAYLOAD_KEYS}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Redis I/O counters for this process (see get_io_stats)
+_io = {"round_trips": 0, "commands": 0, "deferred_saves": 0, "bytes_written": 0, "bytes_read": 0}
+
+
+def _count(commands: int = 1):
+    _io["round_trips"] += 1
+    _io["commands"] += commands
+
+
+def get_io_stats() -> Dict[str, int]:
+    return dict(_io)
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _pack(value: Any) -> bytes:
+    """Serialised + compressed form for blobs and the result cache."""
+    raw = _dumps(value)
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _unpack(blob: bytes) -> Any:
+    _io["bytes_read"] += len(blob)
+    if blob.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Session blob is zstd-compressed but zstandard is not installed")
+        return _loads(zstandard.ZstdDecompressor().decompress(blob))
+    return _loads(zlib.decompress(blob))
+
+
+def _decode_fields(raw: Dict[bytes, bytes]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"payload": {}}
+    for field, value in raw.items():
+        _io["bytes_read"] += len(value)
+        field = field.decode()
+        if field.startswith(PAYLOAD_PREFIX):
+            data["payload"][field[len(PAYLOAD_PREFIX):]] = _loads(value)
+        else:
+            data[field] = _loads(value)
+    return data
+
 class ScraperSession:
     def __init__(self, session_id: str, data: Dict[str, Any]):
         self.session_id = session_id
         self.data = data
-        self.is_dirty = False
+        self._dirty: Set[str] = set()
+        self._uow_depth = 0
+        self._last_flush = time.monotonic()
+        self._legacy = False  # stored in an older layout; rewritten in full on flush
+        # Blob payload keys already fetched (or known to be absent)
+        self._blobs_loaded: Set[str] = set()
+
+    @property
+    def key(self) -> str:
+        return f"session:{self.session_id}"
+
+    def blob_key(self, field: str) -> str:
+        return f"{self.key}:{field}"
+
+    # ---- Dirty tracking ----
+
+    def _fields(self) -> Dict[str, Any]:
+        fields = {k: v for k, v in self.data.items() if k != "payload"}
+        for k, v in self.data.get("payload", {}).items():
+            fields[PAYLOAD_PREFIX + k] = v
+        return fields
+
+    def mark_dirty(self, *keys: str):
+        """Flags top-level keys (or "payload.<key>") as changed; removed keys are deleted on flush."""
+        self._dirty.update(keys)
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self._dirty)
+
+    @is_dirty.setter
+    def is_dirty(self, value: bool):
+        # Coarse form: everything is rewritten on the next flush
+        if value:
+            self._dirty.update(self._fields())
+        else:
+            self._dirty.clear()
 
     @property
     def search_mode(self) -> str:
@@ -33,7 +157,7 @@ class ScraperSession:
     @state.setter
     def state(self, value: str):
         self.data["state"] = value
-        self.is_dirty = True
+        self.mark_dirty("state")
 
     @property
     def cookies(self) -> Dict:
@@ -41,8 +165,9 @@ class ScraperSession:
 
     @cookies.setter
     def cookies(self, value: Dict):
-        self.data["cookies"] = value
-        self.is_dirty = True
+        if value != self.data.get("cookies"):
+            self.data["cookies"] = value
+            self.mark_dirty("cookies")
 
     @property
     def app_token(self) -> Optional[str]:
@@ -50,8 +175,9 @@ class ScraperSession:
 
     @app_token.setter
     def app_token(self, value: Optional[str]):
-        self.data["app_token"] = value
-        self.is_dirty = True
+        if value != self.data.get("app_token"):
+            self.data["app_token"] = value
+            self.mark_dirty("app_token")
 
     @classmethod
     async def create(cls, search_mode: str, payload: Dict[str, Any] = {}) -> "ScraperSession":
@@ -59,7 +185,7 @@ class ScraperSession:
         initial_data = {
             "state": STATE_INIT,
             "search_mode": search_mode,
-            "payload": payload,
+            "payload": dict(payload),
             "app_token": None,
             "cookies": {},
             "retries": 0,
@@ -67,46 +193,229 @@ class ScraperSession:
             "created_at": time.time()
         }
         session = cls(session_id, initial_data)
+        session._blobs_loaded.update(BLOB_PAYLOAD_KEYS)
+        session.is_dirty = True
         await session.save()
         return session
 
+    # ---- Loading ----
+
     @classmethod
-    async def get(cls, session_id: str) -> "ScraperSession":
+    def _from_raw(cls, session_id: str, raw: Dict[bytes, bytes]) -> "ScraperSession":
+        if not raw:
+            raise SessionExpiredError(f"Session {session_id} not found or expired.")
+        session = cls(session_id, _decode_fields(raw))
+        inline = [k for k in BLOB_PAYLOAD_KEYS if k in session.data["payload"]]
+        if inline:
+            # Hash written before blobs were split out: move them on next flush
+            session._blobs_loaded.update(BLOB_PAYLOAD_KEYS)
+            session._legacy = True
+            session.is_dirty = True
+        return session
+
+    @classmethod
+    async def _get_legacy(cls, session_id: str) -> "ScraperSession":
         redis = await get_redis()
         data_json = await redis.get(f"session:{session_id}")
+        _count()
         if not data_json:
             raise SessionExpiredError(f"Session {session_id} not found or expired.")
-        return cls(session_id, json.loads(data_json))
+        _io["bytes_read"] += len(data_json)
+        session = cls(session_id, json.loads(data_json))
+        session._blobs_loaded.update(BLOB_PAYLOAD_KEYS)
+        session._legacy = True
+        session.is_dirty = True
+        return session
+
+    @classmethod
+    async def get(cls, session_id: str) -> "ScraperSession":
+        redis = await get_redis()
+        try:
+            raw = await redis.hgetall(f"session:{session_id}")
+        except ResponseError:
+            return await cls._get_legacy(session_id)
+        _count()
+        return cls._from_raw(session_id, raw)
+
+    @classmethod
+    async def get_with_result(cls, session_id: str) -> Tuple["ScraperSession", Optional[Dict[str, Any]]]:
+        """The session and its cached result, in one round trip."""
+        redis = await get_redis()
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(f"session:{session_id}")
+                pipe.get(f"session:{session_id}:result")
+                raw, blob = await pipe.execute()
+        except ResponseError:
+            session = await cls._get_legacy(session_id)
+            return session, await session.load_result()
+        _count(2)
+        return cls._from_raw(session_id, raw), (_unpack(blob) if blob else None)
+
+    @classmethod
+    async def get_many(cls, session_ids: List[str]) -> List[Optional["ScraperSession"]]:
+        """Several sessions in one round trip; None for missing ones."""
+        if not session_ids:
+            return []
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for sid in session_ids:
+                pipe.hgetall(f"session:{sid}")
+            values = await pipe.execute(raise_on_error=False)
+        _count(len(session_ids))
+
+        sessions = []
+        for sid, raw in zip(session_ids, values):
+            if isinstance(raw, ResponseError):
+                sessions.append(await cls._get_legacy(sid))
+            else:
+                sessions.append(cls._from_raw(sid, raw) if raw else None)
+        return sessions
 
-    async def save(self):
+    async def load_payload(self, *keys: str):
+        """Fetches the named blob payload keys into data["payload"] (one MGET, skipped when already loaded)."""
+        missing = [k for k in keys if k in BLOB_PAYLOAD_KEYS and k not in self._blobs_loaded]
+        if not missing:
+            return
+        redis = await get_redis()
+        blobs = await redis.mget([self.blob_key(PAYLOAD_PREFIX + k) for k in missing])
+        _count()
+        for k, blob in zip(missing, blobs):
+            if blob is not None and k not in self.data["payload"]:
+                self.data["payload"][k] = _unpack(blob)
+        self._blobs_loaded.update(missing)
+
+    # ---- Persistence ----
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """Defers save() until the outermost block exits (write-through fields excepted)."""
+        self._uow_depth += 1
         try:
-            redis = await get_redis()
-            await redis.setex(
-                f"session:{self.session_id}", 
-                settings.SESSION_TTL, 
-                json.dumps(self.data)
-            )
-            self.is_dirty = False
-        except Exception as e:
-            raise e
+            yield self
+        finally:
+            self._uow_depth -= 1
+            if self._uow_depth == 0:
+                await self.flush()
+
+    @classmethod
+    @asynccontextmanager
+    async def open(cls, session_id: str):
+        """get() + unit_of_work(): the usual way for a flow to work on a session."""
+        session = await cls.get(session_id)
+        async with session.unit_of_work():
+            yield session
+
+    async def save(self, result: Optional[Dict[str, Any]] = None, clear_result: bool = False):
+        """
+        Persists changed fields; `result` / `clear_result` update the cached
+        result in the same MULTI, so the two never disagree. Within a unit of
+        work this is a checkpoint that only writes when needed.
+        """
+        if self._uow_depth and result is None and not clear_result:
+            overdue = time.monotonic() - self._last_flush >= settings.SESSION_FLUSH_INTERVAL
+            if not (self._dirty & WRITE_THROUGH_FIELDS) and not overdue:
+                _io["deferred_saves"] += 1
+                return
+        await self.flush(result=result, clear_result=clear_result)
+
+    async def flush(self, result: Optional[Dict[str, Any]] = None, clear_result: bool = False):
+        """Writes every dirty field now."""
+        if not self._dirty and result is None and not clear_result:
+            return
+
+        fields = self._fields()
+        dirty = set(fields) if self._legacy else self._dirty
+        changed = {f: _dumps(fields[f]) for f in dirty - BLOB_FIELDS if f in fields}
+        removed = [f for f in dirty - BLOB_FIELDS if f not in fields]
+        blobs = {f: _pack(fields[f]) for f in dirty & BLOB_FIELDS if f in fields}
+        removed_blobs = [self.blob_key(f) for f in dirty & BLOB_FIELDS if f not in fields]
+
+        ttl = settings.SESSION_TTL
+        redis = await get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            if self._legacy:
+                pipe.delete(self.key)
+            if changed:
+                pipe.hset(self.key, mapping=changed)
+            if removed:
+                pipe.hdel(self.key, *removed)
+            pipe.expire(self.key, ttl)
+            for f, blob in blobs.items():
+                pipe.setex(self.blob_key(f), ttl, blob)
+            if removed_blobs:
+                pipe.delete(*removed_blobs)
+            # Untouched blobs expire together with the hash
+            for f in BLOB_FIELDS - set(blobs):
+                pipe.expire(self.blob_key(f), ttl)
+            if result is not None:
+                result_blob = _pack(result)
+                pipe.setex(self.result_key, ttl, result_blob)
+                _io["bytes_written"] += len(result_blob)
+            elif clear_result:
+                pipe.delete(self.result_key)
+            commands = len(pipe)
+            await pipe.execute()
+        _count(commands)
+        _io["bytes_written"] += sum(map(len, changed.values())) + sum(map(len, blobs.values()))
+
+        self._dirty.clear()
+        self._legacy = False
+        self._last_flush = time.monotonic()
 
     async def delete(self):
         redis = await get_redis()
-        await redis.delete(f"session:{self.session_id}")
+        await redis.delete(self.key, self.result_key, *(self.blob_key(f) for f in BLOB_FIELDS))
+        _count()
+
+    # ---- Computed result cache ----
+    # The structured fetch_results output is kept under its own compressed
+    # key so previews and saves don't re-scrape the case.
+
+    @property
+    def result_key(self) -> str:
+        return f"session:{self.session_id}:result"
+
+    async def save_result(self, result: Dict[str, Any]):
+        redis = await get_redis()
+        blob = _pack(result)
+        await redis.setex(self.result_key, settings.SESSION_TTL, blob)
+        _count()
+        _io["bytes_written"] += len(blob)
+
+    async def load_result(self) -> Optional[Dict[str, Any]]:
+        redis = await get_redis()
+        blob = await redis.get(self.result_key)
+        _count()
+        if not blob:
+            return None
+        return _unpack(blob)
+
+    async def clear_result(self):
+        redis = await get_redis()
+        await redis.delete(self.result_key)
+        _count()
 
     def update_payload(self, updates: Dict[str, Any]):
         self.data["payload"].update(updates)
-        self.is_dirty = True
+        self._blobs_loaded.update(updates)
+        self.mark_dirty(*(PAYLOAD_PREFIX + k for k in updates))
+
+    def replace_payload(self, payload: Dict[str, Any]):
+        old_keys = set(self.data.get("payload", {})) | set(BLOB_PAYLOAD_KEYS)  # blobs may not be loaded
+        self.data["payload"] = dict(payload)
+        self._blobs_loaded.update(BLOB_PAYLOAD_KEYS)
+        self.mark_dirty(*(PAYLOAD_PREFIX + k for k in old_keys | set(payload)))
 
     def set_error(self, error_msg: str):
         self.data["last_error"] = str(error_msg)
         self.state = STATE_FAILED
-        self.is_dirty = True
+        self.mark_dirty("last_error")
 
     def increment_retry(self):
         self.data["retries"] = self.data.get("retries", 0) + 1
-        self.is_dirty = True
+        self.mark_dirty("retries")
 
     def reset_retry(self):
         self.data["retries"] = 0
-        self.is_dirty = True
+        self.mark_dirty("retries")
@@ -31,6 +31,8 @@ class CaseOrderSchema(BaseModel):
     pdf_filename: Optional[str] = None
     file_path: Optional[str] = None
     file_size: Optional[int] = None
+    sha256: Optional[str] = None # content hash of the stored PDF
+    pdf_link_args: Optional[List[str]] = None # displayPdf args, used to fetch the PDF on demand
 
 class CaseCourtSchema(BaseModel):
     name: Optional[str] = None
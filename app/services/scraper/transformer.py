@@ -160,7 +160,9 @@ def transform_to_schema(scraped_data: Dict[str, Any], cino: str) -> CaseSchema:
             order_details=row.get("order_details"),
             pdf_filename=row.get("pdf_filename"), # This will be populated in flows.py
             file_path=row.get("file_path"),
-            file_size=row.get("file_size")
+            file_size=row.get("file_size"),
+            sha256=row.get("sha256"),
+            pdf_link_args=row.get("pdf_link_args")
         ))
 
     # --- 7. Construct Summary & Title ---
@@ -0,0 +1,57 @@
+import httpx
+from typing import Optional, Dict
+from app.core.config import settings
+
+# Process-wide connection pool for services.ecourts.gov.in.
+# Every ECourtsClient gets its own httpx.AsyncClient (and therefore its own
+# cookie jar), but they all route through this single transport so TCP/TLS
+# connections are kept alive and reused across scrape sessions.
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+def get_transport() -> httpx.AsyncHTTPTransport:
+    global _transport
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.ECOURTS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ECOURTS_MAX_KEEPALIVE,
+                keepalive_expiry=settings.ECOURTS_KEEPALIVE_EXPIRY,
+            ),
+            retries=settings.ECOURTS_CONNECT_RETRIES,
+        )
+    return _transport
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Thin proxy to the process-wide transport.
+    Closing a per-session client must not tear down the shared pool,
+    so aclose() is a no-op here; the pool is closed on app shutdown.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await get_transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def build_http_client(headers: Dict, cookies: Optional[Dict] = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=SharedTransport(),
+        headers=headers,
+        cookies=cookies,
+        timeout=httpx.Timeout(
+            settings.ECOURTS_HTTP_TIMEOUT,
+            connect=settings.ECOURTS_CONNECT_TIMEOUT,
+        ),
+        follow_redirects=True,
+    )
+
+
+async def close_transport():
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
@@ -1,5 +1,28 @@
 import json
 from bs4 import BeautifulSoup
+from app.core.config import settings
+from rich import print
+
+# Tree builder for all scraper parsing. lxml is a C parser and much cheaper
+# than the pure-Python html.parser; output is the same for eCourts pages.
+SUPPORTED_PARSERS = ("html.parser", "lxml")
+
+def _resolve_parser(name: str) -> str:
+    if name not in SUPPORTED_PARSERS:
+        print(f"[bold bright_magenta]ECOURTS[/bold bright_magenta]: [bold yellow]WARN[/bold yellow]: Unknown HTML parser '{name}', using html.parser")
+        return "html.parser"
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            print("[bold bright_magenta]ECOURTS[/bold bright_magenta]: [bold yellow]WARN[/bold yellow]: lxml not installed, using html.parser")
+            return "html.parser"
+    return name
+
+HTML_PARSER = _resolve_parser(settings.SCRAPER_HTML_PARSER)
+
+def make_soup(markup) -> BeautifulSoup:
+    return BeautifulSoup(markup, HTML_PARSER)
 
 def parse_options_html(content: str):
     """Parses <option> tags from a select element HTML string or JSON response."""
@@ -31,7 +54,7 @@ def parse_options_html(content: str):
     except Exception:
         pass # Fallback to parsing as raw HTML
 
-    soup = BeautifulSoup(html_to_parse, 'html.parser')
+    soup = make_soup(html_to_parse)
     options = []
     
     for opt in soup.find_all('option'):
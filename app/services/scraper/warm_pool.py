@@ -0,0 +1,277 @@
+import json
+import time
+import uuid
+import base64
+import asyncio
+from typing import Optional, Dict, Any, List
+from app.core.redis import get_redis
+from app.core.config import settings
+from app.services.scraper.client import ECourtsClient
+from rich import print
+
+# Ready-to-use eCourts sessions (token + cookies, optionally a captcha image),
+# kept in a Redis list so every app worker draws from the same pool.
+POOL_KEY = "scraper:warm_pool"
+METRICS_KEY = "scraper:warm_pool:metrics"
+REFILL_LOCK_KEY = "scraper:warm_pool:refill_lock"
+
+# Deletes the refill lock only if it still holds our token, so a refill that
+# outlived the TTL can't release a lock another worker has since taken
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Pops the oldest entry only while more than ARGV[1] entries are left, so
+# helper sessions never eat into what start_session relies on
+POP_SPARE_SCRIPT = """
+if redis.call("llen", KEYS[1]) > tonumber(ARGV[1]) then
+    return redis.call("lpop", KEYS[1])
+end
+return false
+"""
+
+_refill_task: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _max_age() -> int:
+    # Entries must still be usable for a full scraper session after checkout
+    return max(settings.SESSION_TTL - settings.WARM_POOL_TTL_MARGIN, 60)
+
+
+async def _incr(field: str, amount: int = 1):
+    redis = await get_redis()
+    await redis.hincrby(METRICS_KEY, field, amount)
+
+
+async def create_warm_session() -> Optional[Dict[str, Any]]:
+    """Cold-starts one eCourts session and returns it as a pool entry."""
+    client = ECourtsClient()
+    token, _ = await client.get_initial_token()
+    if token is None:
+        return None
+
+    entry = {
+        "app_token": token,
+        "cookies": client.get_cookies(),
+        "captcha": None,
+        "created_at": time.time(),
+    }
+
+    if settings.WARM_POOL_PREFETCH_CAPTCHA:
+        img_bytes = await client.get_captcha()
+        entry["captcha"] = base64.b64encode(img_bytes).decode()
+        entry["app_token"] = client.current_token
+        entry["cookies"] = client.get_cookies()
+
+    return entry
+
+
+async def acquire() -> Optional[Dict[str, Any]]:
+    """Pops the oldest still-valid entry, or None if the pool is empty."""
+    if settings.WARM_POOL_SIZE <= 0:
+        return None
+
+    redis = await get_redis()
+    cutoff = time.time() - _max_age()
+
+    while True:
+        raw = await redis.lpop(POOL_KEY)
+        if raw is None:
+            await _incr("misses")
+            _wake_refiller()
+            return None
+
+        entry = json.loads(raw)
+        if entry["created_at"] < cutoff:
+            await _incr("expired")
+            continue
+
+        await _incr("hits")
+        if await redis.llen(POOL_KEY) < settings.WARM_POOL_SIZE // 2:
+            _wake_refiller()
+        return entry
+
+
+async def open_client() -> Optional[ECourtsClient]:
+    """Returns a tokenised client from the pool, or cold-starts one."""
+    try:
+        pooled = await acquire()
+    except Exception:
+        pooled = None
+
+    if pooled is not None:
+        return ECourtsClient(cookies=pooled["cookies"], current_token=pooled["app_token"])
+
+    client = ECourtsClient()
+    token, _ = await client.get_initial_token()
+    return client if token is not None else None
+
+
+async def acquire_spare() -> Optional[Dict[str, Any]]:
+    """
+    Like acquire(), but only takes an entry while the pool holds more than
+    WARM_POOL_RESERVE of them. Never cold-starts.
+    """
+    if settings.WARM_POOL_SIZE <= 0:
+        return None
+
+    redis = await get_redis()
+    cutoff = time.time() - _max_age()
+
+    while True:
+        raw = await redis.eval(POP_SPARE_SCRIPT, 1, POOL_KEY, settings.WARM_POOL_RESERVE)
+        if raw is None:
+            await _incr("spare_misses")
+            _wake_refiller()
+            return None
+
+        entry = json.loads(raw)
+        if entry["created_at"] < cutoff:
+            await _incr("expired")
+            continue
+
+        await _incr("spare_hits")
+        if await redis.llen(POOL_KEY) < settings.WARM_POOL_SIZE // 2:
+            _wake_refiller()
+        return entry
+
+
+async def open_spare_clients(count: int) -> List[ECourtsClient]:
+    """
+    Up to `count` extra tokenised clients for parallel work, taken from the
+    pool's spare entries only. Returns fewer (possibly none) when the pool is
+    low; callers carry on with the sessions they already have.
+    """
+    clients = []
+    for _ in range(max(count, 0)):
+        try:
+            pooled = await acquire_spare()
+        except Exception as e:
+            print(f"[bold cyan]WARM POOL[/bold cyan]: [bold yellow]WARN[/bold yellow]: spare acquire failed: {e}")
+            break
+        if pooled is None:
+            break
+        clients.append(ECourtsClient(cookies=pooled["cookies"], current_token=pooled["app_token"]))
+    return clients
+
+
+async def _evict_expired(redis) -> int:
+    cutoff = time.time() - _max_age()
+    evicted = 0
+    # Oldest entries sit at the head of the list
+    while True:
+        raw = await redis.lindex(POOL_KEY, 0)
+        if raw is None or json.loads(raw)["created_at"] >= cutoff:
+            break
+        evicted += await redis.lrem(POOL_KEY, 1, raw)
+    if evicted:
+        await _incr("expired", evicted)
+    return evicted
+
+
+async def refill() -> int:
+    """Tops the pool up to WARM_POOL_SIZE. Returns number of sessions added."""
+    redis = await get_redis()
+
+    # Only one worker process refills at a time
+    lock_token = uuid.uuid4().hex
+    acquired = await redis.set(
+        REFILL_LOCK_KEY, lock_token, nx=True, ex=max(settings.WARM_POOL_REFILL_INTERVAL * 2, 60)
+    )
+    if not acquired:
+        return 0
+
+    try:
+        await _evict_expired(redis)
+
+        missing = settings.WARM_POOL_SIZE - await redis.llen(POOL_KEY)
+        if missing <= 0:
+            return 0
+
+        semaphore = asyncio.Semaphore(settings.WARM_POOL_REFILL_CONCURRENCY)
+
+        async def build_one():
+            async with semaphore:
+                try:
+                    return await create_warm_session()
+                except Exception as e:
+                    print(f"[bold cyan]WARM POOL[/bold cyan]: [bold yellow]WARN[/bold yellow]: Failed to build session: {e}")
+                    return None
+
+        started = time.perf_counter()
+        entries = await asyncio.gather(*(build_one() for _ in range(missing)))
+        ready = [json.dumps(e) for e in entries if e]
+
+        async with redis.pipeline(transaction=False) as pipe:
+            if ready:
+                pipe.rpush(POOL_KEY, *ready)
+            pipe.hincrby(METRICS_KEY, "refilled", len(ready))
+            pipe.hincrby(METRICS_KEY, "refill_failures", missing - len(ready))
+            pipe.hset(METRICS_KEY, mapping={
+                "last_refill_at": time.time(),
+                "last_refill_ms": int((time.perf_counter() - started) * 1000),
+            })
+            await pipe.execute()
+
+        print(f"[bold cyan]WARM POOL[/bold cyan]: Refilled {len(ready)}/{missing} sessions")
+        return len(ready)
+
+    finally:
+        await redis.eval(RELEASE_LOCK_SCRIPT, 1, REFILL_LOCK_KEY, lock_token)
+
+
+async def get_metrics() -> Dict[str, Any]:
+    redis = await get_redis()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(METRICS_KEY)
+        pipe.llen(POOL_KEY)
+        raw, size = await pipe.execute()
+    metrics = {k.decode(): float(v) for k, v in raw.items()}
+    metrics["size"] = size
+    metrics["target_size"] = settings.WARM_POOL_SIZE
+    return metrics
+
+
+def _wake_refiller():
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _refill_loop():
+    while True:
+        try:
+            await refill()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[bold cyan]WARM POOL[/bold cyan]: [bold red]ERROR[/bold red]: Refill failed: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.WARM_POOL_REFILL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start():
+    global _refill_task, _wakeup
+    if settings.WARM_POOL_SIZE <= 0 or _refill_task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _refill_task = asyncio.create_task(_refill_loop())
+
+
+async def stop():
+    global _refill_task
+    if _refill_task is None:
+        return
+    _refill_task.cancel()
+    try:
+        await _refill_task
+    except asyncio.CancelledError:
+        pass
+    _refill_task = None
@@ -1,4 +1,28 @@
+import hashlib
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Any
+
+
+class HashingStream:
+    """Wraps an async chunk iterator, tracking size and sha256 as chunks pass through."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    async def __aiter__(self):
+        async for chunk in self._chunks:
+            if not chunk:
+                continue
+            self._hash.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
 
 class FileStorage(ABC):
 
@@ -7,10 +31,27 @@ class FileStorage(ABC):
         """Save file and return public or retrievable URL/path"""
         pass
 
+    @abstractmethod
+    async def save_stream(self, path: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        """
+        Save file from an async chunk iterator without buffering it whole.
+        Returns {"path", "size", "sha256"}.
+        """
+        pass
+
+    @abstractmethod
+    async def move(self, src: str, path: str) -> str:
+        """Move a stored file (as returned by save*) to `path`; returns the new stored path"""
+        pass
+
     @abstractmethod
     async def read(self, path: str) -> bytes:
         pass
 
     @abstractmethod
     async def delete(self, path: str) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        pass
@@ -0,0 +1,222 @@
+import re
+import uuid
+import hashlib
+from collections import Counter
+from typing import Optional, Dict, Any, List, AsyncIterator
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from app.models.case import CaseOrder, OrderBlob
+from app.services.storage import get_storage
+from rich import print
+
+# Order PDFs are stored once per distinct content, at blobs/<sha[:2]>/<sha>.pdf.
+# case_orders rows point at a blob via blob_sha256; order_blobs.ref_count tracks
+# how many rows do, and the file is only deleted when the last one goes away.
+# Taking a reference (upsert) and deleting a file (SELECT ... FOR UPDATE)
+# both hold the blob row's lock, so a file is only removed while its count
+# is 0 and a reference taken afterwards can tell the file may be gone.
+BLOB_PREFIX = "blobs"
+STAGING_PREFIX = "incoming"
+
+_BLOB_PATH_RE = re.compile(rf"{BLOB_PREFIX}/[0-9a-f]{{2}}/([0-9a-f]{{64}})\.pdf$")
+
+
+def blob_path(sha256: str) -> str:
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}.pdf"
+
+
+def sha_from_path(path: Optional[str]) -> Optional[str]:
+    """Recovers the content hash from a blob storage path (None for legacy paths)."""
+    if not path:
+        return None
+    match = _BLOB_PATH_RE.search(path.replace("\\", "/"))
+    return match.group(1) if match else None
+
+
+def order_key(order_no: Optional[str], order_date: Any, p_args: Optional[List[str]]) -> Optional[str]:
+    """Identity of an order's PDF on eCourts: same key means same document."""
+    if not p_args:
+        return None
+    if hasattr(order_date, "isoformat"):
+        order_date = order_date.isoformat()
+    raw = "\x1f".join([order_no or "", order_date or "", *p_args])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def store_stream(chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    Streams a PDF into storage under its content address.
+    The hash is only known once the stream ends, so the file is staged first.
+    """
+    storage = get_storage()
+    staged = await storage.save_stream(f"{STAGING_PREFIX}/{uuid.uuid4().hex}.pdf", chunks)
+    # Identical content maps to the identical path, so overwriting is harmless
+    stored_path = await storage.move(staged["path"], blob_path(staged["sha256"]))
+    return {"path": stored_path, "size": staged["size"], "sha256": staged["sha256"]}
+
+
+def find_stored_order(db: Session, key: Optional[str]) -> Optional[CaseOrder]:
+    """Any order (in any workspace) with the same key whose PDF is already stored."""
+    if not key:
+        return None
+    return db.query(CaseOrder).filter(
+        CaseOrder.order_key == key,
+        CaseOrder.blob_sha256.isnot(None)
+    ).first()
+
+
+def acquire(db: Session, sha256: str, file_path: str, file_size: Optional[int]) -> int:
+    """
+    Takes one reference (locking the blob row until commit) and returns the
+    new count. 1 means nothing else held the blob, so its file may already
+    have been deleted: see confirm_order_files.
+    """
+    stmt = insert(OrderBlob).values(
+        sha256=sha256,
+        file_path=file_path,
+        file_size=file_size,
+        ref_count=1
+    ).on_conflict_do_update(
+        index_elements=[OrderBlob.sha256],
+        set_={"ref_count": OrderBlob.ref_count + 1}
+    ).returning(OrderBlob.ref_count)
+    return db.execute(stmt).scalar_one()
+
+
+def release(db: Session, sha256: str) -> Optional[str]:
+    """
+    Drops one reference. Returns the file path if this was the last one;
+    the caller passes it to delete_files after its transaction commits.
+    The row stays at 0 until then, for delete_files to re-check under lock.
+    """
+    row = db.execute(
+        update(OrderBlob)
+        .where(OrderBlob.sha256 == sha256)
+        .values(ref_count=OrderBlob.ref_count - 1)
+        .returning(OrderBlob.ref_count, OrderBlob.file_path)
+    ).first()
+
+    if row is None or row.ref_count > 0:
+        return None
+    return row.file_path
+
+
+def resolve_order_file(
+    db: Session,
+    o: Dict[str, Any],
+    known: Optional[Dict[str, CaseOrder]] = None,
+    fallback_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Works out the stored file for a scraped order about to be inserted and
+    takes a blob reference for it. Reuses an already-stored PDF for the same
+    order (from `known`, else any workspace) instead of downloading again.
+    Returns the CaseOrder column values: file_path, file_size, blob_sha256, order_key.
+    """
+    key = order_key(o.get("order_no"), o.get("order_date"), o.get("pdf_link_args"))
+    file_path = o.get("file_path") or fallback_path
+    file_size = o.get("file_size")
+    sha = o.get("sha256") or sha_from_path(file_path)
+
+    if not sha:
+        existing = (known or {}).get(key) if key else None
+        existing = existing or find_stored_order(db, key)
+        if existing:
+            file_path = existing.file_path
+            file_size = existing.file_size
+            sha = existing.blob_sha256
+
+    if sha:
+        acquire(db, sha, file_path, file_size)
+
+    return {
+        "file_path": file_path,
+        "file_size": file_size,
+        "blob_sha256": sha,
+        "order_key": key,
+    }
+
+
+async def confirm_order_files(db: Session, case_id) -> int:
+    """
+    Run after taking the references for a case's orders, before committing.
+    A blob only this case references may have been created, or revived from
+    0, by those references, and a PDF stored while scraping or previewing
+    held no reference, so its file can have been deleted meanwhile. Those
+    files are checked (our row locks keep them from being deleted from here
+    on); orders whose file is gone lose it and are fetched again on first
+    view. Returns the number of orders cleared.
+    """
+    orders = db.query(CaseOrder).filter(
+        CaseOrder.case_id == case_id,
+        CaseOrder.blob_sha256.isnot(None)
+    ).all()
+    refs = Counter(o.blob_sha256 for o in orders)
+    if not refs:
+        return 0
+
+    blobs = db.query(OrderBlob).filter(OrderBlob.sha256.in_(list(refs))).all()
+    storage = get_storage()
+    missing = [
+        b.sha256 for b in blobs
+        if b.ref_count <= refs[b.sha256] and not await storage.exists(b.file_path)
+    ]
+    if not missing:
+        return 0
+
+    cleared = 0
+    for o in orders:
+        if o.blob_sha256 in missing:
+            print(f"[bold blue]PDF[/bold blue]: [bold yellow]WARN[/bold yellow]: Stored PDF is gone, not reusing it:", o.file_path)
+            o.file_path = o.file_size = o.blob_sha256 = None
+            cleared += 1
+    db.flush()
+
+    # Every reference left on these was ours
+    db.query(OrderBlob).filter(
+        OrderBlob.sha256.in_(missing)
+    ).delete(synchronize_session=False)
+    return cleared
+
+
+def release_orders(db: Session, orders: List[CaseOrder]) -> List[str]:
+    """
+    Releases the blob references held by `orders`.
+    Returns storage paths that are no longer referenced (legacy, non-blob
+    files included) so the caller can delete them after committing.
+    """
+    unused = []
+    for order in orders:
+        if order.blob_sha256:
+            path = release(db, order.blob_sha256)
+            if path:
+                unused.append(path)
+        elif order.file_path:
+            unused.append(order.file_path)
+    return unused
+
+
+async def delete_files(db: Session, paths: List[str]):
+    """
+    Deletes files released by release_orders, once the releasing transaction
+    has committed. A blob file is only deleted if its row is still at 0 under
+    lock; a reference taken in the meantime keeps it.
+    """
+    storage = get_storage()
+    for path in paths:
+        sha = sha_from_path(path)
+        try:
+            if sha:
+                blob = db.query(OrderBlob).filter(OrderBlob.sha256 == sha).with_for_update().first()
+                if blob is None or blob.ref_count > 0:
+                    db.rollback()
+                    continue
+                await storage.delete(path)
+                db.delete(blob)
+                db.commit()
+            else:
+                await storage.delete(path)
+        except Exception as e:
+            db.rollback()
+            print(f"[bold blue]PDF[/bold blue]: [bold red]ERROR[/bold red]: Failed to delete PDF:", path, e)
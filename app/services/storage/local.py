@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from .base import FileStorage
+from typing import AsyncIterator, Dict, Any
+from .base import FileStorage, HashingStream
 
 
 class LocalStorage(FileStorage):
@@ -18,6 +19,35 @@ class LocalStorage(FileStorage):
 
         return str(full_path)
 
+    async def save_stream(self, path: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        full_path = self.root / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a sibling temp file so readers never see a partial PDF
+        tmp_path = full_path.with_name(full_path.name + ".part")
+        stream = HashingStream(chunks)
+        try:
+            with open(tmp_path, "wb") as f:
+                async for chunk in stream:
+                    f.write(chunk)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+        return {"path": str(full_path), "size": stream.size, "sha256": stream.sha256}
+
+    async def move(self, src: str, path: str) -> str:
+        full_path = self.root / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+
+        src_path = Path(src)
+        os.replace(src_path, full_path)
+        await self._cleanup_empty_parents(src_path.parent)
+
+        return str(full_path)
+
     async def read(self, path: str) -> bytes:
         with open(path, "rb") as f:
             return f.read()
@@ -29,6 +59,9 @@ class LocalStorage(FileStorage):
             full_path.unlink()
             await self._cleanup_empty_parents(full_path.parent)
 
+    async def exists(self, path: str) -> bool:
+        return Path(path).is_file()
+
     async def _cleanup_empty_parents(self, folder: Path):
         """
         Recursively remove empty directories up to storage root.
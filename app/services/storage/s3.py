@@ -1,15 +1,27 @@
+import asyncio
 import boto3
-from .base import FileStorage
+from botocore.exceptions import ClientError
+from typing import AsyncIterator, Dict, Any
+from .base import FileStorage, HashingStream
+
+# S3 requires every multipart part except the last to be at least 5 MB
+MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
+# head_object error codes meaning the key is absent (anything else is re-raised)
+NOT_FOUND_CODES = ("404", "NoSuchKey", "NotFound")
 
 
 class S3Storage(FileStorage):
+    # boto3 is blocking: every call runs in a worker thread so uploads don't
+    # stall the event loop
 
     def __init__(self, bucket: str):
         self.bucket = bucket
         self.s3 = boto3.client("s3")
 
     async def save(self, path: str, content: bytes) -> str:
-        self.s3.put_object(
+        await asyncio.to_thread(
+            self.s3.put_object,
             Bucket=self.bucket,
             Key=path,
             Body=content,
@@ -17,12 +29,98 @@ class S3Storage(FileStorage):
         )
         return path  # store only key, not full s3:// url
 
+    async def _upload_part(self, path: str, upload_id: str, part_number: int, body: bytes) -> Dict[str, Any]:
+        resp = await asyncio.to_thread(
+            self.s3.upload_part,
+            Bucket=self.bucket,
+            Key=path,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=body
+        )
+        return {"ETag": resp["ETag"], "PartNumber": part_number}
+
+    async def save_stream(self, path: str, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+        stream = HashingStream(chunks)
+        buffer = bytearray()
+        upload_id = None
+        parts = []
+
+        try:
+            async for chunk in stream:
+                buffer.extend(chunk)
+                if len(buffer) < MULTIPART_PART_SIZE:
+                    continue
+
+                if upload_id is None:
+                    upload_id = (await asyncio.to_thread(
+                        self.s3.create_multipart_upload,
+                        Bucket=self.bucket,
+                        Key=path,
+                        ContentType="application/pdf"
+                    ))["UploadId"]
+
+                parts.append(await self._upload_part(path, upload_id, len(parts) + 1, bytes(buffer)))
+                buffer.clear()
+
+            if upload_id is None:
+                # Small file: a single put is cheaper than a multipart upload
+                await self.save(path, bytes(buffer))
+            else:
+                if buffer:
+                    parts.append(await self._upload_part(path, upload_id, len(parts) + 1, bytes(buffer)))
+
+                await asyncio.to_thread(
+                    self.s3.complete_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=path,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+        except BaseException:
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.s3.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=path,
+                    UploadId=upload_id
+                )
+            raise
+
+        return {"path": path, "size": stream.size, "sha256": stream.sha256}
+
+    async def move(self, src: str, path: str) -> str:
+        await asyncio.to_thread(
+            self.s3.copy_object,
+            Bucket=self.bucket,
+            Key=path,
+            CopySource={"Bucket": self.bucket, "Key": src},
+            ContentType="application/pdf",
+            MetadataDirective="REPLACE"
+        )
+        await self.delete(src)
+        return path
+
     async def read(self, path: str) -> bytes:
-        obj = self.s3.get_object(Bucket=self.bucket, Key=path)
-        return obj["Body"].read()
+        def get():
+            obj = self.s3.get_object(Bucket=self.bucket, Key=path)
+            return obj["Body"].read()
+
+        return await asyncio.to_thread(get)
 
     async def delete(self, path: str) -> None:
-        self.s3.delete_object(
+        await asyncio.to_thread(
+            self.s3.delete_object,
             Bucket=self.bucket,
             Key=path
-        )
\ No newline at end of file
+        )
+
+    async def exists(self, path: str) -> bool:
+        try:
+            await asyncio.to_thread(self.s3.head_object, Bucket=self.bucket, Key=path)
+            return True
+        except ClientError as e:
+            # 403s and throttling say nothing about the object: don't report it missing
+            if e.response.get("Error", {}).get("Code") in NOT_FOUND_CODES:
+                return False
+            raise
@@ -0,0 +1,74 @@
+import asyncio
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.scraper import flows
+from app.services.scraper.client import ECourtsClient
+from app.services.scraper.session import ScraperSession, STATE_SEARCH_SUBMITTED
+
+# A refresh whose business rows only partly loaded must not store the page
+# fingerprint, or the next refresh short-circuits as unchanged and the failed
+# rows are never fetched again.
+CASE_HTML = Path(__file__).parent / "fixtures" / "scraper" / "case_history" / "civil_suit_raw.html"
+
+
+class MemorySession(ScraperSession):
+    """ScraperSession that never touches Redis."""
+
+    async def load_payload(self, *keys: str):
+        pass
+
+    async def save(self, result=None, clear_result=False):
+        self.is_dirty = False
+
+
+async def _refresh(known_fingerprint):
+    session = MemorySession("test-refresh", {
+        "state": STATE_SEARCH_SUBMITTED,
+        "search_mode": "cnr",
+        "payload": {"cnr": "XXXX000000000000", "result_html": CASE_HTML.read_text(encoding="utf-8")},
+        "cookies": {},
+        "app_token": None,
+    })
+    result = None
+    async for event, data in flows._build_results(session, None, False, known_fingerprint):
+        if event in flows.TERMINAL_EVENTS:
+            result = data
+    return result
+
+
+def test_failed_business_row_is_fetched_on_next_refresh(monkeypatch):
+    monkeypatch.setattr(settings, "BUSINESS_FETCH_SESSIONS", 1)
+    monkeypatch.setattr(settings, "ORDER_PDF_PREFETCH_RECENT", 0)
+
+    calls = []
+    down = True
+
+    async def view_business(self, params):
+        calls.append(params)
+        if down:
+            raise ValueError("viewBusiness unavailable")
+        return "Business on date"
+
+    monkeypatch.setattr(ECourtsClient, "view_business", view_business)
+
+    # 1. eCourts fails the business row: result is partial, no fingerprint kept
+    first = asyncio.run(_refresh(known_fingerprint=None))
+    assert calls, "fixture has no business rows"
+    assert first["complete"] is False
+    assert flows.source_fingerprint(first) is None
+
+    # 2. Next refresh scrapes in full and fetches the row again
+    down = False
+    fetched_before = len(calls)
+    second = asyncio.run(_refresh(known_fingerprint=flows.source_fingerprint(first)))
+    assert "unchanged" not in second
+    assert len(calls) > fetched_before
+    assert second["complete"] is True
+    assert flows.source_fingerprint(second) == second["fingerprint"]
+
+    # 3. Once complete, an unchanged page short-circuits
+    fetched_before = len(calls)
+    third = asyncio.run(_refresh(known_fingerprint=flows.source_fingerprint(second)))
+    assert third["unchanged"] is True
+    assert len(calls) == fetched_before